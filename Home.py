@@ -1,7 +1,11 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from st_aggrid import AgGrid, GridOptionsBuilder
-from data_fetcher import get_top_coins
+from data_fetcher import get_top_coins, stale_data_age
+from price_stream import RENDER_INTERVAL, get_stream
+from prefetch import VISIBLE_COINS, get_prefetcher
+from anomalies import describe, get_detector
 
 # ✅ Page config FIRST
 st.set_page_config(page_title="📈 Crypto Dashboard", layout="wide", initial_sidebar_state="collapsed")
@@ -9,6 +13,9 @@ st.set_page_config(page_title="📈 Crypto Dashboard", layout="wide", initial_si
 # --- Global settings from session ---
 currency = st.session_state.get("currency", "usd")
 refresh_interval = st.session_state.get("refresh", 180)
+live_stream = st.session_state.get("live_stream", False)
+# The live feed is in USD, so ticks are only overlaid on USD prices
+stream = get_stream() if live_stream and currency == "usd" else None
 
 # --- Currency symbol mapping ---
 currency_symbols = {
@@ -69,9 +76,28 @@ def predict_trend(change):
         return "🔽 Decrease"
     return "➖ Stable"
 
+# --- 7-Day Sparkline ---
+def sparkline_svg(prices, width=180, height=40):
+    """Inline SVG polyline of the 7-day prices, green if up over the week, red if down."""
+    prices = prices[np.isfinite(prices)]
+    if len(prices) < 2:
+        return ""
+    low, high = prices.min(), prices.max()
+    x = np.linspace(0, width, len(prices))
+    y = height - (prices - low) / ((high - low) or 1) * height
+    points = " ".join(f"{px:.1f},{py:.1f}" for px, py in zip(x, y))
+    color = "#16a34a" if prices[-1] >= prices[0] else "#dc2626"
+    return (
+        f"<svg width='{width}' height='{height}' viewBox='0 -1 {width} {height + 2}'>"
+        f"<polyline points='{points}' fill='none' stroke='{color}' stroke-width='1.5'/></svg>"
+    )
+
 # --- Load and filter coins ---
 try:
-    coins = get_top_coins(100)
+    coins = get_top_coins(100, currency)
+    age = stale_data_age()
+    if age is not None:
+        st.caption(f"⏳ Showing data from {age / 60:.0f} min ago while it refreshes.")
 
     if search:
         coins = [c for c in coins if search.lower() in c["name"].lower() or search.lower() in c["symbol"].lower()]
@@ -87,25 +113,72 @@ try:
 
     coins = sorted(coins, key=sort_key, reverse=(sort_order == "Descending"))
 
+    # Warm the coins most likely to be opened next, so Coin Details paints from the snapshot
+    get_prefetcher().request(
+        [c["id"] for c in coins[:VISIBLE_COINS]]
+        + st.session_state.get("watchlist", [])
+        + [p["id"] for p in st.session_state.get("portfolio", [])]
+    )
+
+    # --- Unusual Moves ---
+    # Re-read on the refresh interval; the detector is updated whenever the snapshot is refetched
+    @st.fragment(run_every=refresh_interval)
+    def unusual_moves():
+        moves = get_detector(currency).anomalies()
+        if not moves:
+            return
+        st.markdown("### 🚨 Unusual Moves")
+        st.caption("Price or volume changes far outside each coin's recent range, from the last hour of market snapshots.")
+        cols = st.columns(4)
+        for i, move in enumerate(moves[:8]):
+            with cols[i % 4]:
+                st.metric(
+                    f"{move['name']} ({move['symbol']})",
+                    f"{move['price_change']:+.2f}%",
+                    f"{move['score']:.1f}σ",
+                    delta_color="off",
+                    help=describe(move),
+                )
+
+    unusual_moves()
+
     # --- Display Coins ---
     st.markdown("### 🪙 Top Coins")
     if view_mode == "Card View":
-        for i in range(0, len(coins), 3):
-            row = st.columns(3)
-            for j in range(3):
-                if i + j < len(coins):
-                    coin = coins[i + j]
-                    with row[j]:
-                        st.markdown(f"<div class='coin-card'>", unsafe_allow_html=True)
-                        st.markdown(f"### {coin['name']} ({coin['symbol'].upper()})")
-                        st.write(f"💸 Price: {symbol}{coin[f'current_price_{currency}']:,.2f}")
-                        st.write(f"🏦 Market Cap: {symbol}{coin[f'market_cap_{currency}']:,.0f}")
-                        st.write(f"📈 24h Volume: {symbol}{coin[f'total_volume_{currency}']:,.0f}")
-                        st.write(f"📊 24h Change: {predict_trend(coin.get('price_change_percentage_24h', 0))}")
-                        if st.button("🔍 View Details", key=coin["id"]):
-                            st.session_state.selected_coin = coin["id"]
-                            st.switch_page("pages/CoinDetails.py")
-                        st.markdown("</div>", unsafe_allow_html=True)
+        # Only the cards rerun on the refresh interval (every second while streaming):
+        # they re-read the shared snapshot and live ticks, nothing is refetched
+        @st.fragment(run_every=RENDER_INTERVAL if stream else refresh_interval)
+        def coin_cards(coin_ids):
+            latest = {c["id"]: c for c in get_top_coins(100, currency)}
+            cards = [latest[cid] for cid in coin_ids if cid in latest]
+            moves = {move["id"]: move for move in get_detector(currency).anomalies(coin_ids)}
+            if stream:
+                stream.track(coin_ids)
+            for i in range(0, len(cards), 3):
+                row = st.columns(3)
+                for j in range(3):
+                    if i + j < len(cards):
+                        with row[j]:
+                            coin_card(cards[i + j], moves.get(cards[i + j]["id"]))
+
+        def coin_card(coin, move=None):
+            tick = stream.latest(coin["id"]) if stream else None
+            price = tick[1] if tick else coin[f"current_price_{currency}"]
+            st.markdown(f"<div class='coin-card'>", unsafe_allow_html=True)
+            st.markdown(f"### {coin['name']} ({coin['symbol'].upper()})")
+            st.write(f"💸 Price: {symbol}{price:,.2f}{' 🔴 live' if tick else ''}")
+            st.write(f"🏦 Market Cap: {symbol}{coin[f'market_cap_{currency}']:,.0f}")
+            st.write(f"📈 24h Volume: {symbol}{coin[f'total_volume_{currency}']:,.0f}")
+            st.write(f"📊 24h Change: {predict_trend(coin.get('price_change_percentage_24h', 0))}")
+            st.markdown(sparkline_svg(coin["sparkline"]), unsafe_allow_html=True)
+            if move:
+                st.caption(f"🚨 Unusual move: {describe(move)}")
+            if st.button("🔍 View Details", key=coin["id"]):
+                st.session_state.selected_coin = coin["id"]
+                st.switch_page("pages/CoinDetails.py")
+            st.markdown("</div>", unsafe_allow_html=True)
+
+        coin_cards([c["id"] for c in coins])
     else:
         df = pd.DataFrame(coins)
         df = df[[
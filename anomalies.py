@@ -0,0 +1,202 @@
+"""
+Market-wide anomaly detection on the top-coins snapshot.
+
+Every fresh markets snapshot (see data_fetcher.get_top_coins) updates, for
+each coin in it, exponentially weighted statistics of two features:
+
+- the log return of its price since the coin's previous snapshot
+- the log change of its 24h volume over the same interval
+
+Both are scaled to a REFERENCE_INTERVAL step, so snapshots taken at uneven
+intervals stay comparable. A coin is flagged when its latest return is more
+than THRESHOLD standard deviations from its mean, or its volume change is
+that far above its mean, once it has WARMUP observations behind it.
+
+State is a fixed handful of numbers per coin in NumPy arrays and a snapshot
+is processed as a whole, so the cost per refresh grows with the number of
+coins, not with their history.
+"""
+import math
+import threading
+import time
+
+import numpy as np
+
+HALFLIFE = 6 * 3600  # seconds
+REFERENCE_INTERVAL = 300  # seconds
+# Snapshots of a coin closer together than this (e.g. two page sizes of one refresh) count once
+MIN_INTERVAL = 30
+# About two hours of snapshots at the hub's refresh rate before a coin can be flagged
+WARMUP = 24
+THRESHOLD = 5.0
+# How long a flagged move stays listed
+ACTIVE_FOR = 3600
+# Floors of the standard deviations, so flat series (stablecoins) don't flag on rounding
+MIN_STD = np.array([1e-4, 1e-3])
+INITIAL_CAPACITY = 256
+
+# Per-coin state arrays: name -> (initial value, shape per coin); pairs are (price, volume)
+STATE = {
+    "_last": (np.nan, (2,)),  # log price and log volume at the coin's previous snapshot
+    "_m1": (0.0, (2,)),  # EWMA of the scaled changes
+    "_m2": (0.0, (2,)),  # EWMA of their squares
+    "_weight": (0.0, ()),  # total EWMA weight, to correct the early bias towards zero
+    "_count": (0.0, ()),
+    "_updated_at": (np.nan, ()),
+    "_flagged_at": (np.nan, ()),
+    "_flag_z": (np.nan, (2,)),
+    "_flag_change": (np.nan, (2,)),
+    "_flag_interval": (np.nan, ()),
+}
+
+
+class AnomalyDetector:
+    def __init__(self, halflife=HALFLIFE, threshold=THRESHOLD, warmup=WARMUP):
+        self.halflife = halflife
+        self.threshold = threshold
+        self.warmup = warmup
+        self._lock = threading.Lock()
+        self._rows = {}  # coin id -> row of the state arrays
+        self._names = []  # row -> (id, name, symbol)
+        self._allocate(INITIAL_CAPACITY)
+
+    def _allocate(self, capacity):
+        for name, (fill, shape) in STATE.items():
+            array = np.full((capacity,) + shape, fill)
+            old = getattr(self, name, None)
+            if old is not None:
+                array[:len(old)] = old
+            setattr(self, name, array)
+
+    def _row(self, coin):
+        row = self._rows.get(coin["id"])
+        if row is None:
+            row = self._rows[coin["id"]] = len(self._names)
+            self._names.append(None)
+            if row >= len(self._last):
+                self._allocate(2 * len(self._last))
+        self._names[row] = (coin["id"], coin.get("name", coin["id"]), coin.get("symbol", "").upper())
+        return row
+
+    def __len__(self):
+        return len(self._names)
+
+    def observe(self, coins, now=None):
+        """
+        Update the statistics with a markets snapshot (coin dicts with
+        current_price and total_volume) and return the moves it flagged,
+        as anomalies() does.
+        """
+        now = time.time() if now is None else now
+        values = np.array([(c.get("current_price"), c.get("total_volume")) for c in coins], dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.log(values.reshape(-1, 2))
+        values[~np.isfinite(values)] = np.nan
+
+        with self._lock:
+            rows = np.fromiter((self._row(c) for c in coins), dtype=np.intp, count=len(coins))
+            last = self._last[rows]
+            dt = now - self._updated_at[rows]
+            change = values - last
+            # New coins (and features seen for the first time) only set a baseline
+            self._last[rows] = np.where(np.isnan(last), values, last)
+            self._updated_at[rows[np.isnan(dt)]] = now
+            # Unchanged values are the upstream cache, not a new observation
+            with np.errstate(invalid="ignore"):
+                step = (dt >= MIN_INTERVAL) & np.any(np.nan_to_num(change) != 0, axis=1)
+
+            rows, dt, change, values = rows[step], dt[step], change[step], values[step]
+            scaled = change / np.sqrt(dt / REFERENCE_INTERVAL)[:, None]
+            weight = self._weight[rows][:, None]
+            mean = self._m1[rows] / np.where(weight > 0, weight, 1)
+            var = self._m2[rows] / np.where(weight > 0, weight, 1) - mean ** 2
+            with np.errstate(invalid="ignore"):
+                z = (scaled - mean) / np.maximum(np.sqrt(np.maximum(var, 0)), MIN_STD)
+                flag = (self._count[rows] >= self.warmup) & (
+                    (np.abs(z[:, 0]) >= self.threshold) | (z[:, 1] >= self.threshold)
+                )
+
+            # The decay depends on the time since each coin's previous snapshot
+            alpha = (1 - np.exp(-math.log(2) * dt / self.halflife))[:, None]
+            seen = np.isfinite(scaled)
+            self._m1[rows] = np.where(seen, (1 - alpha) * self._m1[rows] + alpha * np.nan_to_num(scaled), self._m1[rows])
+            self._m2[rows] = np.where(seen, (1 - alpha) * self._m2[rows] + alpha * np.nan_to_num(scaled) ** 2, self._m2[rows])
+            self._weight[rows] = (1 - alpha[:, 0]) * self._weight[rows] + alpha[:, 0]
+            self._last[rows] = np.where(np.isnan(values), self._last[rows], values)
+            self._updated_at[rows] = now
+            self._count[rows] += 1
+
+            flagged = rows[flag]
+            self._flagged_at[flagged] = now
+            self._flag_z[flagged] = z[flag]
+            self._flag_change[flagged] = change[flag]
+            self._flag_interval[flagged] = dt[flag]
+            return self._moves(flagged)
+
+    def anomalies(self, coin_ids=None, now=None):
+        """
+        Moves flagged in the last ACTIVE_FOR seconds, strongest first, each
+        {"id", "name", "symbol", "price_change", "price_z", "volume_change",
+        "volume_z", "score", "price_spike", "volume_spike", "minutes",
+        "detected_at"}, where score is the stronger of the two spikes,
+        with changes in percent over the `minutes` between the two snapshots.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if coin_ids is None:
+                rows = np.arange(len(self._names))
+            else:
+                rows = np.array([self._rows[c] for c in coin_ids if c in self._rows], dtype=np.intp)
+            with np.errstate(invalid="ignore"):
+                rows = rows[self._flagged_at[rows] >= now - ACTIVE_FOR]
+            return self._moves(rows)
+
+    def _moves(self, rows):
+        # Only rising volume counts as a spike
+        strength = np.fmax(np.abs(self._flag_z[rows, 0]), self._flag_z[rows, 1])
+        moves = []
+        order = np.argsort(-strength)
+        for row, score in zip(rows[order], strength[order]):
+            coin_id, name, symbol = self._names[row]
+            price_z, volume_z = self._flag_z[row]
+            price_change, volume_change = np.expm1(self._flag_change[row]) * 100
+            moves.append({
+                "id": coin_id,
+                "name": name,
+                "symbol": symbol,
+                "price_change": float(price_change),
+                "price_z": float(price_z),
+                "volume_change": float(volume_change),
+                "volume_z": float(volume_z),
+                "score": float(score),
+                "price_spike": bool(abs(price_z) >= self.threshold),
+                "volume_spike": bool(volume_z >= self.threshold),
+                "minutes": float(self._flag_interval[row] / 60),
+                "detected_at": float(self._flagged_at[row]),
+            })
+        return moves
+
+
+def describe(move):
+    """One-line summary of a move from AnomalyDetector.anomalies()."""
+    parts = []
+    if move["price_spike"]:
+        parts.append(f"price {move['price_change']:+.2f}% ({move['price_z']:+.1f}σ)")
+    if move["volume_spike"]:
+        parts.append(f"24h volume {move['volume_change']:+.1f}% ({move['volume_z']:+.1f}σ)")
+    return f"{move['symbol']} {' and '.join(parts)} in {move['minutes']:.0f} min"
+
+
+_detectors = {}
+_detectors_lock = threading.Lock()
+
+
+def get_detector(currency="usd", create=True):
+    """
+    Return the detector fed by this process's markets snapshots in `currency`;
+    None with `create` False when no snapshot in it has been seen.
+    """
+    with _detectors_lock:
+        if currency not in _detectors and create:
+            _detectors[currency] = AnomalyDetector()
+        return _detectors.get(currency)
@@ -0,0 +1,311 @@
+"""
+Headless JSON API over the dashboard's data and indicator layer.
+
+    python -m api_server --port 8080
+
+Endpoints (all GET unless noted):
+
+    /coins?limit=100&currency=usd          top coins with their 7-day sparkline
+    /coins/{id}                            coin details
+    /coins/{id}/history?days=30            timestamps, prices, volumes, market caps
+    /coins/{id}/indicators?days=60         RSI, MACD, SMA, EMA, Bollinger, stochastic
+    POST /indicators                       {"coins": [...], "days": 60, "latest": false}
+    /screener?min_market_cap=&max_change=&sort_by=volume&limit=20
+    /anomalies?currency=usd                price and volume spikes of the last hour
+    POST /portfolio/value                  {"positions": [{"id", "quantity", "avg_price"}]}
+    /stats                                 cache, upstream call and provider counters
+
+Data comes from the same hub as the dashboard, so the service benefits from
+(and adds to) its snapshot; run it with the dashboard's CRYPTO_HUB_DIR to
+share it between the processes. Encoded responses are cached in the hub next
+to the data they were made from, so a request for warm data is a dictionary
+lookup and a write. Requests for data that isn't held yet are loaded on a
+thread pool and never block the event loop.
+"""
+import argparse
+import asyncio
+import json
+import math
+
+import numpy as np
+import requests
+from aiohttp import web
+
+from anomalies import get_detector
+from data_fetcher import get_coin_details, get_crypto_history, get_indicators, get_top_coins
+from data_hub import get_hub
+from data_processing import CoinDetail, value_portfolio
+from providers import get_router
+from response_archive import ReplayMissError
+from screener import screen_coins
+from upstream import CircuitOpenError
+
+DEFAULT_DAYS = 60
+MAX_DAYS = 365
+MAX_BATCH = 250
+
+
+def _plain(value):
+    """JSON-ready version of arrays (NaN -> null), NumPy scalars and CoinDetails."""
+    if isinstance(value, np.ndarray):
+        return np.where(np.isfinite(value), value, None).tolist() if value.dtype.kind == "f" else value.tolist()
+    if isinstance(value, np.generic):
+        return _finite(value.item())
+    if isinstance(value, CoinDetail):
+        return value.to_dict()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _finite(data):
+    """`data` with NaN and infinite floats, NumPy float64 scalars included, replaced by None."""
+    if isinstance(data, float):
+        return data if math.isfinite(data) else None
+    if isinstance(data, dict):
+        return {key: _finite(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_finite(value) for value in data]
+    return data
+
+
+def _encode(data):
+    try:
+        text = json.dumps(data, default=_plain, allow_nan=False, separators=(",", ":"))
+    except ValueError:
+        # NaN isn't JSON; np.float64 subclasses float, so _plain never sees those scalars
+        text = json.dumps(_finite(data), default=_plain, allow_nan=False, separators=(",", ":"))
+    return text.encode("utf-8")
+
+
+def _json(body, status=200):
+    return web.Response(body=body, status=status, content_type="application/json")
+
+
+def _int_param(request, name, default, low=1, high=None):
+    try:
+        value = int(request.query.get(name, default))
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"{name} must be an integer")
+    if value < low or (high is not None and value > high):
+        raise web.HTTPBadRequest(text=f"{name} must be between {low} and {high}")
+    return value
+
+
+def _float_param(request, name):
+    if name not in request.query:
+        return None
+    try:
+        return float(request.query[name])
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"{name} must be a number")
+
+
+async def _load(keys, func, *args):
+    """
+    Call `func(*args)` inline when every hub key it reads is held (a lookup,
+    stale values revalidate in the background), else on the thread pool.
+    """
+    hub = get_hub()
+    if all(hub.age(key) is not None for key in keys):
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+# --- Encoders: each result is encoded once per source object and cached in the hub ---
+
+def top_coins_body(limit, currency):
+    coins = get_top_coins(limit, currency)
+    return get_hub().derive(("api", "top_coins", limit, currency), coins, lambda: _encode(coins))
+
+
+def details_body(coin_id):
+    coin = get_coin_details(coin_id)
+    return get_hub().derive(("api", "coin_details", coin_id), coin, lambda: _encode(coin))
+
+
+def history_body(coin_id, days):
+    history = get_crypto_history(coin_id, days)
+    return get_hub().derive(("api", "crypto_history", coin_id, days), history, lambda: _encode({
+        "timestamps": history.timestamps,
+        "prices": history.prices,
+        "volumes": history.volumes,
+        "market_caps": history.market_caps,
+    }))
+
+
+def indicators_body(coin_id, days, latest=False):
+    history = get_crypto_history(coin_id, days)
+    frame = get_indicators(coin_id, days)
+    if latest:
+        return get_hub().derive(("api", "indicators_latest", coin_id, days), frame, lambda: _encode(
+            dict({column: frame[column].to_numpy()[-1] for column in frame}, timestamp=history.timestamps[-1])
+            if len(frame) else {}
+        ))
+    return get_hub().derive(("api", "indicators", coin_id, days), frame, lambda: _encode(
+        dict({column: frame[column].to_numpy() for column in frame}, timestamps=history.timestamps)
+    ))
+
+
+def _history_keys(coin_id, days, latest=False):
+    """The hub keys indicators_body reads, so warm requests are answered inline."""
+    body = "indicators_latest" if latest else "indicators"
+    return [("crypto_history", coin_id, days, False), ("api", body, coin_id, days)]
+
+
+# --- Handlers ---
+
+async def top_coins(request):
+    limit = _int_param(request, "limit", 100, high=250)
+    currency = request.query.get("currency", "usd").lower()
+    return _json(await _load([("top_coins", limit, currency, 1)], top_coins_body, limit, currency))
+
+
+async def coin_details(request):
+    coin_id = request.match_info["coin_id"]
+    return _json(await _load([("coin_details", coin_id)], details_body, coin_id))
+
+
+async def coin_history(request):
+    coin_id = request.match_info["coin_id"]
+    days = _int_param(request, "days", 30, high=MAX_DAYS)
+    return _json(await _load([("crypto_history", coin_id, days, False)], history_body, coin_id, days))
+
+
+async def coin_indicators(request):
+    coin_id = request.match_info["coin_id"]
+    days = _int_param(request, "days", DEFAULT_DAYS, high=MAX_DAYS)
+    latest = request.query.get("latest", "false").lower() == "true"
+    return _json(await _load(_history_keys(coin_id, days, latest), indicators_body, coin_id, days, latest))
+
+
+async def batch_indicators(request):
+    try:
+        payload = await request.json()
+        coin_ids = [str(c) for c in payload["coins"]]
+        days = int(payload.get("days", DEFAULT_DAYS))
+        latest = bool(payload.get("latest", False))
+    except (ValueError, KeyError, TypeError):
+        raise web.HTTPBadRequest(text='Expected {"coins": [...], "days": 60, "latest": false}')
+    if not 1 <= days <= MAX_DAYS or len(coin_ids) > MAX_BATCH:
+        raise web.HTTPBadRequest(text=f"days must be 1-{MAX_DAYS} and at most {MAX_BATCH} coins")
+
+    async def one(coin_id):
+        try:
+            return await _load(_history_keys(coin_id, days, latest), indicators_body, coin_id, days, latest)
+        except requests.RequestException as e:
+            return _encode({"error": _upstream_error(e)})
+        except Exception as e:
+            return _encode({"error": str(e)})
+
+    # Cold coins load concurrently on the pool; the hub coalesces duplicates
+    bodies = await asyncio.gather(*(one(coin_id) for coin_id in coin_ids))
+    # Splice the cached per-coin bodies instead of re-encoding them
+    items = (json.dumps(coin_id).encode("utf-8") + b":" + body for coin_id, body in zip(coin_ids, bodies))
+    return _json(b"{" + b",".join(items) + b"}")
+
+
+async def screener(request):
+    currency = request.query.get("currency", "usd").lower()
+    limit = _int_param(request, "limit", 20, high=250)
+    coins = await _load([("top_coins", 250, currency, 1)], get_top_coins, 250, currency)
+    result = screen_coins(
+        coins,
+        currency=currency,
+        min_market_cap=_float_param(request, "min_market_cap"),
+        max_market_cap=_float_param(request, "max_market_cap"),
+        min_volume=_float_param(request, "min_volume"),
+        min_change=_float_param(request, "min_change"),
+        max_change=_float_param(request, "max_change"),
+        sort_by=request.query.get("sort_by", "market_cap"),
+        descending=request.query.get("order", "desc").lower() != "asc",
+        limit=limit,
+    )
+    return _json(_encode(result))
+
+
+async def anomalies(request):
+    # Currencies no markets snapshot has used have nothing flagged; don't keep a detector for each
+    detector = get_detector(request.query.get("currency", "usd").lower(), create=False)
+    # A coin flagged on volume alone may lack a price change; _encode sends that NaN as null
+    return _json(_encode(detector.anomalies() if detector is not None else []))
+
+
+async def portfolio_value(request):
+    try:
+        positions = (await request.json())["positions"]
+        positions = [
+            dict(pos, id=str(pos["id"]), quantity=float(pos["quantity"]), avg_price=float(pos["avg_price"]))
+            for pos in positions
+        ]
+    except (ValueError, KeyError, TypeError):
+        raise web.HTTPBadRequest(text='Expected {"positions": [{"id": ..., "quantity": ..., "avg_price": ...}]}')
+    coin_ids = list(dict.fromkeys(pos["id"] for pos in positions))
+    coins = await asyncio.gather(*(_load([("coin_details", cid)], get_coin_details, cid) for cid in coin_ids))
+    rows, totals = value_portfolio(positions, {cid: coin.current_price for cid, coin in zip(coin_ids, coins)})
+    return _json(_encode({"positions": rows, "totals": totals}))
+
+
+async def stats(request):
+    hub = get_hub()
+    return _json(_encode({
+        "cache": hub.stats(),
+        "cache_bytes": hub.nbytes,
+        "upstream_calls": hub.upstream_calls,
+        "providers": get_router().stats(),
+    }))
+
+
+def _upstream_error(error):
+    """What to tell the client about a failed upstream request: the status at most, never the URL."""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return f"Upstream request failed with status {error.response.status_code}"
+    return "Upstream request failed"
+
+
+@web.middleware
+async def errors(request, handler):
+    """Upstream problems become JSON errors with a matching status."""
+    try:
+        return await handler(request)
+    except web.HTTPException as e:
+        if e.status < 400:
+            raise
+        return _json(_encode({"error": e.text}), status=e.status)
+    except CircuitOpenError as e:
+        return _json(_encode({"error": str(e)}), status=503)
+    except ReplayMissError as e:
+        return _json(_encode({"error": str(e)}), status=404)
+    except requests.HTTPError as e:
+        status = e.response.status_code if e.response is not None else None
+        return _json(_encode({"error": _upstream_error(e)}), status=404 if status == 404 else 502)
+    except requests.RequestException as e:
+        return _json(_encode({"error": _upstream_error(e)}), status=502)
+    except ValueError as e:
+        return _json(_encode({"error": str(e)}), status=502)
+
+
+def create_app():
+    app = web.Application(middlewares=[errors])
+    app.add_routes([
+        web.get("/coins", top_coins),
+        web.get("/coins/{coin_id}", coin_details),
+        web.get("/coins/{coin_id}/history", coin_history),
+        web.get("/coins/{coin_id}/indicators", coin_indicators),
+        web.post("/indicators", batch_indicators),
+        web.get("/screener", screener),
+        web.get("/anomalies", anomalies),
+        web.post("/portfolio/value", portfolio_value),
+        web.get("/stats", stats),
+    ])
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+OHLCV candles at several timeframes.
+
+A CandleRollup keeps one level of bars per timeframe (1m -> 5m -> 1h -> 1d).
+It is built from a PriceSeries by aggregating each level from the one below
+it, and then kept current by feeding it live ticks, which update the open bar
+of every level. Reading a timeframe returns the precomputed level; the full
+history is never resampled. Each bar opens at the previous bar's close, so a
+bar holding a single sample (hourly history at 1h) still has a real range.
+Levels finer than the history's spacing (1m and 5m for hourly data) are left
+to the live ticks rather than filled with one sample per hour.
+
+Closed bars are kept as a NumPy array of (start, open, high, low, close,
+volume) rows; bars closed by ticks go to a small tail buffer that is merged
+into it once full, so a tick never copies the history.
+
+CoinGecko's market_chart volumes are rolling 24h totals, so the volume of a bar
+is estimated as each sample's share of its 24h total over the sample interval.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_hub import get_hub
+
+TIMEFRAMES = {"1m": 60_000, "5m": 300_000, "1h": 3_600_000, "1d": 86_400_000}
+MAX_BARS = 5000
+# Bars closed by live ticks collected before they are merged into a level's array
+TAIL_BARS = 256
+DAY_MS = 86_400_000
+
+_FIELDS = ("start", "open", "high", "low", "close", "volume")
+
+
+def _aggregate(start, open_, high, low, close, volume, size):
+    """Merge consecutive bars (or points) into bars of `size` milliseconds."""
+    if not len(start):
+        return start, open_, high, low, close, volume
+    bucket = start - start % size
+    first = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    last = np.r_[first[1:] - 1, len(start) - 1]
+    return (
+        bucket[first],
+        open_[first],
+        np.maximum.reduceat(high, first),
+        np.minimum.reduceat(low, first),
+        close[last],
+        np.add.reduceat(volume, first),
+    )
+
+
+class _Level:
+    __slots__ = ("size", "max_bars", "bars", "tail", "tail_len", "current")
+
+    def __init__(self, size, max_bars):
+        self.size = size
+        self.max_bars = max_bars
+        self.bars = np.empty((0, len(_FIELDS)))
+        self.tail = None
+        self.tail_len = 0
+        self.current = None
+
+    @property
+    def nbytes(self):
+        return self.bars.nbytes + (0 if self.tail is None else self.tail.nbytes) + 8 * len(_FIELDS)
+
+    def extend(self, bars):
+        """Set the closed bars from the columns of _aggregate; the last one stays open."""
+        rows = np.column_stack([np.asarray(column, dtype=np.float64) for column in bars])
+        self.bars = rows[:-1][-self.max_bars:].copy()
+        self.current = rows[-1].tolist()
+
+    def rows(self):
+        """Closed bars then the open one, oldest first."""
+        parts = [self.bars]
+        if self.tail_len:
+            parts.append(self.tail[:self.tail_len])
+        if self.current is not None:
+            parts.append(np.array([self.current]))
+        rows = np.concatenate(parts)
+        return rows[-(self.max_bars + 1):]
+
+    def _close(self, bar):
+        if self.tail is None:
+            self.tail = np.empty((TAIL_BARS, len(_FIELDS)))
+        self.tail[self.tail_len] = bar
+        self.tail_len += 1
+        if self.tail_len == len(self.tail):
+            self.bars = np.concatenate([self.bars, self.tail])[-self.max_bars:]
+            self.tail_len = 0
+
+    def add(self, timestamp, price, volume):
+        start = timestamp - timestamp % self.size
+        bar = self.current
+        if bar is None or start > bar[0]:
+            open_ = price if bar is None else bar[4]
+            if bar is not None:
+                self._close(bar)
+            self.current = [start, open_, max(open_, price), min(open_, price), price, volume]
+        elif start == bar[0]:
+            bar[2] = max(bar[2], price)
+            bar[3] = min(bar[3], price)
+            bar[4] = price
+            bar[5] += volume
+        # Ticks older than the open bar are dropped
+
+
+class CandleRollup:
+    def __init__(self, timeframes=TIMEFRAMES, max_bars=MAX_BARS):
+        self.timeframes = dict(sorted(timeframes.items(), key=lambda item: item[1]))
+        self.levels = {name: _Level(size, max_bars) for name, size in self.timeframes.items()}
+        self.last_timestamp = 0
+        self.spacing = None
+        self.source = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_price_series(cls, series, timeframes=TIMEFRAMES, max_bars=MAX_BARS):
+        rollup = cls(timeframes, max_bars)
+        rollup.source = series
+        timestamps = series.timestamps
+        if not len(timestamps):
+            return rollup
+        prices = series.prices.astype(np.float64)
+        intervals = np.diff(timestamps, prepend=timestamps[0]).astype(np.float64)
+        rollup.spacing = float(np.median(intervals[1:])) if len(intervals) > 1 else float(DAY_MS)
+        intervals[0] = rollup.spacing
+        volumes = np.nan_to_num(series.volumes.astype(np.float64)) * intervals / DAY_MS
+
+        # Every sample opens where the previous one closed
+        opens = np.r_[prices[:1], prices[:-1]]
+        bars = (timestamps, opens, np.maximum(opens, prices), np.minimum(opens, prices), prices, volumes)
+        for level in rollup.levels.values():
+            # CoinGecko timestamps drift by a few seconds, hence the tolerance
+            if level.size < rollup.spacing * 0.9:
+                continue
+            bars = _aggregate(*bars, level.size)
+            level.extend(bars)
+        rollup.last_timestamp = int(timestamps[-1])
+        return rollup
+
+    @property
+    def nbytes(self):
+        return sum(level.nbytes for level in self.levels.values())
+
+    def add(self, timestamp, price, volume=0.0):
+        """Add one tick; every level's open bar is updated in amortised O(1)."""
+        timestamp = int(timestamp)
+        with self._lock:
+            if timestamp <= self.last_timestamp:
+                return
+            for level in self.levels.values():
+                level.add(timestamp, float(price), volume)
+            self.last_timestamp = timestamp
+
+    def add_ticks(self, timestamps, prices):
+        """Add the ticks newer than the last one seen, e.g. straight from a ring buffer."""
+        for timestamp, price in zip(timestamps.tolist(), prices.tolist()):
+            if timestamp > self.last_timestamp:
+                self.add(timestamp, price)
+
+    def available(self):
+        """
+        Timeframes with bars: those the history fills, with at least one
+        data point per bar, and finer ones once live ticks have reached them.
+        """
+        with self._lock:
+            names = [name for name, level in self.levels.items() if level.current is not None]
+        return names or list(self.timeframes)
+
+    def candles(self, timeframe):
+        """Return the bars of `timeframe` as a DataFrame (Date, open, high, low, close, volume)."""
+        with self._lock:
+            rows = self.levels[timeframe].rows()
+        columns = dict(zip(_FIELDS, rows.T))
+        frame = pd.DataFrame({name: columns[name] for name in _FIELDS[1:]})
+        frame.insert(0, "Date", columns["start"].astype(np.int64).view("datetime64[ms]"))
+        return frame
+
+
+def get_rollup(coin_id, days, history):
+    """
+    Return the process-wide rollup for `coin_id` built from `history`,
+    rebuilding it only when the hub has fetched a new history.
+    """
+    return get_hub().derive(("candles", coin_id, days), history, lambda: CandleRollup.from_price_series(history))
@@ -1,43 +1,68 @@
-import requests
-import streamlit as st
-
-@st.cache_data(ttl=300)
-def get_top_coins(limit=100, currency="usd"):
-    url = f"https://api.coingecko.com/api/v3/coins/markets"
-    params = {
-        "vs_currency": currency,
-        "order": "market_cap_desc",
-        "per_page": limit,
-        "page": 1,
-        "sparkline": False,
-        "price_change_percentage": "24h"
-    }
-    response = requests.get(url, params=params)
-    coins = response.json()
-
-    # Rename currency fields
-    for coin in coins:
-        coin[f"current_price_{currency}"] = coin["current_price"]
-        coin[f"market_cap_{currency}"] = coin["market_cap"]
-        coin[f"total_volume_{currency}"] = coin["total_volume"]
+from anomalies import get_detector
+from data_hub import get_hub, stale_age
+from providers import get_router
+from utils import indicator_args, indicator_frame
 
+# Upstream calls go through the provider router (see providers.py), which picks
+# the fastest healthy source and hedges slow requests
+def _fetch_top_coins(limit, currency, page=1):
+    coins = get_router().call("top_coins", limit, currency, page)
+    # Each fresh markets snapshot (including the hub's background refreshes) feeds the anomaly detector
+    get_detector(currency).observe(coins)
     return coins
 
-@st.cache_data(ttl=300)
+def _fetch_coin_details(coin_id):
+    return get_router().call("coin_details", coin_id)
+
+def _fetch_crypto_history(coin_id, days, float32):
+    return get_router().call("history", coin_id, days, float32)
+
+# Public getters go through the process-wide hub so all sessions share one
+# snapshot and one upstream call per key. Returned values are shared: don't mutate.
+def get_top_coins(limit=100, currency="usd", page=1):
+    return get_hub().get(("top_coins", limit, currency, page), lambda: _fetch_top_coins(limit, currency, page))
+
 def get_coin_details(coin_id):
-    url = f"https://api.coingecko.com/api/v3/coins/{coin_id}"
-    params = {"localization": False}
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    return response.json()
-
-@st.cache_data(ttl=300)
-def get_crypto_history(coin_id, days=30):
-    url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart"
-    params = {
-        "vs_currency": "usd",
-        "days": days
-    }
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    return response.json()
+    return get_hub().get(("coin_details", coin_id), lambda: _fetch_coin_details(coin_id))
+
+def get_crypto_history(coin_id, days=30, float32=False):
+    return get_hub().get(
+        ("crypto_history", coin_id, days, float32),
+        lambda: _fetch_crypto_history(coin_id, days, float32)
+    )
+
+def load_crypto_history(coin_id, days=30, float32=False):
+    """
+    History for bulk jobs: the hub's copy when it holds one, else fetched
+    without caching so a large export doesn't evict what pages are using.
+    """
+    history = get_hub().peek(("crypto_history", coin_id, days, float32))
+    return history if history is not None else _fetch_crypto_history(coin_id, days, float32)
+
+def _params_key(names, params):
+    # Hashable form of the indicator choices, for the hub key
+    params = params or {}
+    return tuple(names or ()), tuple(sorted(
+        (name, tuple(sorted(args.items())))
+        for name, args in params.items()
+    ))
+
+def get_indicators(coin_id, days=30, names=None, params=None):
+    """
+    Indicator frame (see utils.indicator_frame) computed once per fetched
+    history and choice of indicators and parameters.
+    """
+    history = get_crypto_history(coin_id, days)
+    # Default choices share the key the prefetcher warms
+    names, params = indicator_args(names, params)
+    key = ("indicators", coin_id, days)
+    if names or params:
+        key += (_params_key(names, params),)
+    return get_hub().derive(key, history, lambda: indicator_frame(history, names, params))
+
+def stale_data_age():
+    """
+    Age in seconds of the oldest expired value served to this script run while
+    it is revalidated in the background (e.g. during an outage), or None.
+    """
+    return stale_age()
@@ -0,0 +1,396 @@
+"""
+Process-wide data hub shared by every Streamlit session.
+
+All sessions of a server process read upstream data through one hub. It keeps a
+snapshot of the latest responses (top coins, coin details, hot histories),
+refreshes the hot entries in the background before they expire and coalesces
+concurrent requests for the same key into a single upstream call.
+
+Expired entries are served stale while a background call revalidates them, so
+an upstream outage shows the last known good data instead of an error.
+
+Set the CRYPTO_HUB_DIR environment variable to a directory shared by several
+Streamlit server processes to share the snapshot between them as well.
+
+The hub is bounded: entries are sized when stored and the least recently used
+ones are evicted once the total passes the memory budget (CRYPTO_CACHE_MB,
+default 256), so memory stays flat however long the server runs. Values
+computed from hub data (indicator frames, candle rollups) are kept in the same
+budget through derive().
+"""
+import collections
+import contextlib
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, the store still works
+    fcntl = None
+
+DEFAULT_TTL = 300
+HOT_KEYS = 20
+REFRESH_INTERVAL = 15
+RETRY_BACKOFF = 30
+MEMORY_BUDGET = int(float(os.environ.get("CRYPTO_CACHE_MB", 256)) * 1024 * 1024)
+
+_served = threading.local()
+
+
+def estimate_size(value):
+    """Approximate memory footprint of `value` in bytes."""
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is not None and not callable(nbytes):
+        # NumPy arrays, pandas Series, PriceSeries, CandleRollup
+        return int(nbytes)
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage):
+        # DataFrames
+        return int(memory_usage(deep=True).sum())
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(v) for v in value)
+    else:
+        for name in getattr(type(value), "__slots__", ()):
+            size += estimate_size(getattr(value, name, None))
+    return size
+
+
+def _namespace(key):
+    """Statistics are kept per namespace, the first item of a tuple key."""
+    return key[0] if isinstance(key, tuple) and key else key
+
+
+class _Entry:
+    __slots__ = ("value", "fetched_at", "last_used", "loader", "ttl", "refresh", "retry_at", "size", "source")
+
+    def __init__(self, value, fetched_at, loader, ttl, refresh=True, source=None):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.last_used = time.time()
+        self.loader = loader
+        self.ttl = ttl
+        # Whether the background refresher keeps the entry fresh
+        self.refresh = refresh
+        self.retry_at = 0
+        self.size = estimate_size(value)
+        # What a derived value was computed from; None for upstream values
+        self.source = source
+
+
+class _Call:
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class FileSnapshotStore:
+    """
+    File-backed snapshot shared between server processes.
+    Each key is pickled to its own file and replaced atomically; a per-key
+    lock file makes sure only one process calls upstream for a key at a time.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.pkl")
+
+    def load(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                stored_key, value, fetched_at = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if stored_key != key:
+            return None
+        return value, fetched_at
+
+    def save(self, key, value, fetched_at):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((key, value, fetched_at), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        if fcntl is None:
+            yield
+            return
+        with open(self._path(key) + ".lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class DataHub:
+    """
+    Snapshot of upstream responses with request coalescing.
+    Values are shared between sessions and must be treated as read-only.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, store=None, hot_keys=HOT_KEYS, max_bytes=MEMORY_BUDGET):
+        self.ttl = ttl
+        self.store = store
+        self.hot_keys = hot_keys
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.upstream_calls = 0
+        # Least recently used first
+        self._entries = collections.OrderedDict()
+        self._stats = collections.defaultdict(collections.Counter)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._refresher = None
+
+    def get(self, key, loader, ttl=None, refresh=True):
+        """
+        Return the value for `key`, calling `loader()` only when the snapshot
+        has no value yet. Concurrent callers for the same key share one call.
+        An expired value is returned as is and revalidated in the background;
+        its age is reported through stale_age(). With `refresh` False the
+        entry is only reloaded when read after expiring, never ahead of time
+        by the refresher: for calls that cost more than the data is worth
+        between views, like news and AI summaries.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            entry = self._entries.get(key)
+            stats = self._stats[_namespace(key)]
+            if entry is not None:
+                now = time.time()
+                entry.last_used = now
+                self._entries.move_to_end(key)
+                age = now - entry.fetched_at
+                stats["hits"] += 1
+                if age >= entry.ttl:
+                    stats["stale"] += 1
+                    _served.stale_age = max(getattr(_served, "stale_age", None) or 0, age)
+                    if key not in self._inflight and now >= entry.retry_at:
+                        entry.retry_at = now + RETRY_BACKOFF
+                        self._revalidate(key, entry)
+                return entry.value
+            stats["misses"] += 1
+        return self._load(key, loader, ttl, refresh)
+
+    def derive(self, key, source, compute):
+        """
+        Return the value `compute()` made from `source`, computing it again
+        only when `source` is not the object it was last computed from, e.g.
+        after the hub fetched a new history. Derived values share the memory
+        budget with everything else and are never revalidated.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            stats = self._stats[_namespace(key)]
+            if entry is not None and entry.source is source:
+                entry.last_used = time.time()
+                self._entries.move_to_end(key)
+                stats["hits"] += 1
+                return entry.value
+            stats["misses"] += 1
+        value = compute()
+        with self._lock:
+            self._put(key, _Entry(value, time.time(), None, self.ttl, refresh=False, source=source))
+        return value
+
+    def peek(self, key):
+        """Return the value held for `key`, fresh or not, without loading it or marking it used; None if not held."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry.value
+
+    def age(self, key):
+        """Seconds since `key` was last fetched, or None if it isn't held."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else time.time() - entry.fetched_at
+
+    def snapshot(self):
+        """Return {key: value} for every entry currently held by this process."""
+        with self._lock:
+            return {key: entry.value for key, entry in self._entries.items()}
+
+    def stats(self):
+        """
+        Return {namespace: counters} with the hits, stale hits, misses and
+        evictions so far and the entries and bytes currently held.
+        """
+        with self._lock:
+            report = {name: dict(counts, entries=0, bytes=0) for name, counts in self._stats.items()}
+            for key, entry in self._entries.items():
+                row = report.setdefault(_namespace(key), {"entries": 0, "bytes": 0})
+                row["entries"] += 1
+                row["bytes"] += entry.size
+        for row in report.values():
+            for counter in ("hits", "stale", "misses", "evictions"):
+                row.setdefault(counter, 0)
+        return report
+
+    def invalidate(self, key=None, namespace=None):
+        """Drop `key`, every key of `namespace`, or everything when neither is given."""
+        with self._lock:
+            if key is not None:
+                keys = [key] if key in self._entries else []
+            elif namespace is not None:
+                keys = [k for k in self._entries if _namespace(k) == namespace]
+            else:
+                keys = list(self._entries)
+            for k in keys:
+                self.nbytes -= self._entries.pop(k).size
+
+    def _put(self, key, entry):
+        """Store `entry` and evict the least recently used entries past the budget; needs self._lock."""
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.nbytes -= previous.size
+            entry.last_used = previous.last_used
+        if entry.size > self.max_bytes:
+            # Would evict everything else; serve it without keeping it
+            self._stats[_namespace(key)]["evictions"] += 1
+            return
+        self._entries[key] = entry
+        self.nbytes += entry.size
+        while self.nbytes > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key):
+        self.nbytes -= self._entries.pop(key).size
+        self._stats[_namespace(key)]["evictions"] += 1
+
+    def _load(self, key, loader, ttl, refresh=True):
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            value, fetched_at = self._fetch(key, loader, ttl)
+            entry = _Entry(value, fetched_at, loader, ttl, refresh)
+            with self._lock:
+                self._put(key, entry)
+            call.value = value
+            return value
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.event.set()
+
+    def _revalidate(self, key, entry):
+        def run():
+            try:
+                self._load(key, entry.loader, entry.ttl, entry.refresh)
+            except Exception:
+                # Keep serving the stale value and back off before the next attempt
+                with self._lock:
+                    current = self._entries.get(key)
+                    if current is not None:
+                        current.retry_at = time.time() + RETRY_BACKOFF
+
+        threading.Thread(target=run, name="data-hub-revalidate", daemon=True).start()
+
+    def _fetch(self, key, loader, ttl):
+        if self.store is None:
+            self.upstream_calls += 1
+            return loader(), time.time()
+        with self.store.lock(key):
+            # Another process may have refreshed the key while we waited
+            stored = self.store.load(key)
+            if stored is not None and time.time() - stored[1] < ttl:
+                return stored
+            self.upstream_calls += 1
+            value, fetched_at = loader(), time.time()
+            self.store.save(key, value, fetched_at)
+            return value, fetched_at
+
+    def refresh_due(self):
+        """
+        Reload hot entries before they expire and drop the ones nobody has
+        asked for in a while.
+        """
+        now = time.time()
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if now - entry.last_used > entry.ttl * 10:
+                    self._evict(key)
+            hot = [item for item in reversed(self._entries.items()) if item[1].refresh]
+            due = [
+                (key, entry) for key, entry in hot[:self.hot_keys]
+                if now - entry.fetched_at > entry.ttl * 0.8
+            ]
+        for key, entry in due:
+            if now < entry.retry_at:
+                continue
+            try:
+                self._load(key, entry.loader, entry.ttl)
+            except Exception:
+                # Keep serving the current value until upstream recovers
+                with self._lock:
+                    entry.retry_at = time.time() + RETRY_BACKOFF
+
+    def start_refresher(self, interval=REFRESH_INTERVAL):
+        if self._refresher is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.refresh_due()
+
+        self._refresher = threading.Thread(target=run, name="data-hub-refresher", daemon=True)
+        self._refresher.start()
+
+
+def stale_age():
+    """
+    Return the age in seconds of the oldest expired value served to the
+    current thread (i.e. the current script run) since the last call, or None.
+    """
+    age = getattr(_served, "stale_age", None)
+    _served.stale_age = None
+    return age
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    """Return the hub shared by every session of this server process."""
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            directory = os.environ.get("CRYPTO_HUB_DIR")
+            store = FileSnapshotStore(directory) if directory else None
+            _hub = DataHub(store=store)
+            _hub.start_refresher()
+        return _hub
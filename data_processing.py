@@ -1,20 +1,165 @@
+import numpy as np
 import pandas as pd
 
+class CoinDetail:
+    """
+    Compact, read-only projection of a CoinGecko /coins/{id} response.
+    Only the fields the pages read are kept (prices in USD), so the shared
+    cache holds a few hundred bytes per coin instead of the full payload.
+    """
+    __slots__ = (
+        "id", "name", "symbol", "current_price", "market_cap", "total_volume",
+        "circulating_supply", "total_supply", "max_supply", "ath",
+        "ath_change_percentage", "price_change_percentage_24h",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CoinDetail is read-only")
+
+    def __reduce__(self):
+        return (_coin_detail_from_dict, (self.to_dict(),))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"CoinDetail(id={self.id!r}, price={self.current_price!r})"
+
+    @classmethod
+    def from_api(cls, data, currency="usd"):
+        market = data.get("market_data") or {}
+
+        def in_currency(field):
+            return (market.get(field) or {}).get(currency)
+
+        return cls(
+            id=data["id"],
+            name=data["name"],
+            symbol=data["symbol"],
+            current_price=in_currency("current_price"),
+            market_cap=in_currency("market_cap"),
+            total_volume=in_currency("total_volume"),
+            circulating_supply=market.get("circulating_supply"),
+            total_supply=market.get("total_supply"),
+            max_supply=market.get("max_supply"),
+            ath=in_currency("ath"),
+            ath_change_percentage=in_currency("ath_change_percentage"),
+            price_change_percentage_24h=market.get("price_change_percentage_24h"),
+        )
+
+def _coin_detail_from_dict(fields):
+    return CoinDetail(**fields)
+
+class PriceSeries:
+    """
+    Columnar price history built once from a CoinGecko /market_chart response.
+    Timestamps are int64 milliseconds; prices, volumes and market caps are
+    float64 (or float32 when requested). The arrays are read-only so frames
+    and series are handed out as views without copying.
+    """
+    __slots__ = ("timestamps", "prices", "volumes", "market_caps")
+
+    def __init__(self, timestamps, prices, volumes, market_caps):
+        for name, values in zip(self.__slots__, (timestamps, prices, volumes, market_caps)):
+            values.flags.writeable = False
+            object.__setattr__(self, name, values)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PriceSeries is read-only")
+
+    def __reduce__(self):
+        return (PriceSeries, tuple(np.array(getattr(self, name)) for name in self.__slots__))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __repr__(self):
+        return f"PriceSeries(points={len(self)}, dtype={self.prices.dtype})"
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.__slots__)
+
+    @classmethod
+    def from_market_chart(cls, data, float32=False):
+        dtype = np.float32 if float32 else np.float64
+        # Lists from the API, or float64 arrays when replaying a recording
+        points = np.asarray(data.get("prices", []), dtype=np.float64).reshape(-1, 2)
+        timestamps = points[:, 0].astype(np.int64)
+
+        def column(name):
+            values = np.asarray(data.get(name, []), dtype=np.float64).reshape(-1, 2)
+            if len(values) == len(timestamps):
+                return values[:, 1].astype(dtype)
+            # Shouldn't happen with CoinGecko, but don't misalign the columns if it does
+            return np.full(len(timestamps), np.nan, dtype=dtype)
+
+        return cls(timestamps, points[:, 1].astype(dtype), column("total_volumes"), column("market_caps"))
+
+    @property
+    def dates(self):
+        return self.timestamps.view("datetime64[ms]")
+
+    def price_series(self):
+        return pd.Series(self.prices, name="price", copy=False)
+
+    def to_frame(self):
+        return pd.DataFrame({
+            "timestamp": self.timestamps,
+            "Date": self.dates,
+            "price": self.prices,
+            "volume": self.volumes,
+            "market_cap": self.market_caps,
+        }, copy=False)
+
+def downsample(values, points):
+    """Evenly spaced float32 samples of `values` (first and last included); None becomes NaN."""
+    values = np.asarray([np.nan if v is None else v for v in values], dtype=np.float32)
+    if len(values) <= points:
+        return values
+    return values[np.linspace(0, len(values) - 1, points).round().astype(np.int64)]
+
+def value_portfolio(positions, prices):
+    """
+    Value `positions` ({id, quantity, avg_price, ...} dicts) at `prices`
+    ({coin id: current price}). Returns one row per position with its value
+    and P&L, and the totals.
+    """
+    rows = []
+    for pos in positions:
+        price = prices[pos["id"]]
+        rows.append(dict(
+            pos,
+            current_price=price,
+            value=pos["quantity"] * price,
+            pnl=(price - pos["avg_price"]) * pos["quantity"],
+        ))
+    totals = {
+        "cost": sum(pos["quantity"] * pos["avg_price"] for pos in positions),
+        "value": sum(row["value"] for row in rows),
+        "pnl": sum(row["pnl"] for row in rows),
+    }
+    return rows, totals
+
 def process_coin_list(data):
     df = pd.DataFrame(data)
     return df[['id', 'symbol', 'name', 'current_price', 'market_cap', 'total_volume', 'price_change_percentage_24h']]
 
-def process_coin_details(data):
+def process_coin_details(coin):
     return {
-        "Name": data['name'],
-        "Symbol": data['symbol'].upper(),
-        "Current Price (USD)": data['market_data']['current_price']['usd'],
-        "Market Cap": data['market_data']['market_cap']['usd'],
-        "Total Volume": data['market_data']['total_volume']['usd'],
-        "Circulating Supply": data['market_data']['circulating_supply'],
-        "Total Supply": data['market_data']['total_supply'],
-        "Max Supply": data['market_data'].get('max_supply', 'N/A'),
-        "All Time High": data['market_data']['ath']['usd'],
-        "ATH Change (%)": data['market_data']['ath_change_percentage']['usd'],
-        "Price Change (24h)": data['market_data']['price_change_percentage_24h'],
+        "Name": coin.name,
+        "Symbol": coin.symbol.upper(),
+        "Current Price (USD)": coin.current_price,
+        "Market Cap": coin.market_cap,
+        "Total Volume": coin.total_volume,
+        "Circulating Supply": coin.circulating_supply,
+        "Total Supply": coin.total_supply,
+        "Max Supply": coin.max_supply if coin.max_supply is not None else 'N/A',
+        "All Time High": coin.ath,
+        "ATH Change (%)": coin.ath_change_percentage,
+        "Price Change (24h)": coin.price_change_percentage_24h,
     }
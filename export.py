@@ -0,0 +1,183 @@
+"""
+Bulk export of price histories and indicators to Parquet or Arrow IPC.
+
+Coins are processed one at a time: each history is read from the hub (or
+fetched without caching it), run through the indicator functions of utils and
+appended to the output as Arrow record batches, which are flushed every
+CHUNK_ROWS rows. Memory therefore depends on the chunk size, not on how many
+coins are exported.
+
+    python -m export --top 500 --days 365 --indicators rsi,macd --out top500.parquet
+    python -m export --coins bitcoin,ethereum --start 2024-01-01 --format arrow --out btc-eth.arrow
+
+Fetching from CoinGecko pauses whenever its spare rate limit runs out (see
+upstream.spare_capacity), so a large export doesn't starve the dashboard;
+histories the hub already holds, or that another provider serves, are written
+without waiting. A coin still waiting after CAPACITY_TIMEOUT seconds (e.g.
+during an outage) is reported as failed.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+
+from data_fetcher import get_top_coins, load_crypto_history
+from data_hub import get_hub
+from providers import get_router
+from upstream import spare_capacity
+from utils import INDICATORS, indicator_frame
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+CHUNK_ROWS = 65_536
+RATE_RESERVE = 0.5
+CAPACITY_TIMEOUT = 120
+DAY_MS = 86_400_000
+
+
+def export_schema(indicators=(), float32=False):
+    value = pa.float32() if float32 else pa.float64()
+    columns = list(indicator_frame(pd.Series([1.0]), indicators).columns) if indicators else []
+    return pa.schema(
+        [
+            ("coin_id", pa.string()),
+            ("timestamp", pa.timestamp("ms", tz="UTC")),
+            ("price", value),
+            ("volume", value),
+            ("market_cap", value),
+        ]
+        + [(column, pa.float64()) for column in columns]
+    )
+
+
+def _to_ms(value):
+    return None if value is None else int(pd.Timestamp(value, tz="UTC").value // 1_000_000)
+
+
+def coin_batch(coin_id, history, schema, indicators=(), start_ms=None, end_ms=None):
+    """One coin's rows as a RecordBatch; indicators are computed on the full history before trimming to the range."""
+    keep = np.ones(len(history), dtype=bool)
+    if start_ms is not None:
+        keep &= history.timestamps >= start_ms
+    if end_ms is not None:
+        keep &= history.timestamps <= end_ms
+    columns = {
+        "coin_id": np.full(int(keep.sum()), coin_id, dtype=object),
+        "timestamp": history.timestamps[keep],
+        "price": history.prices[keep],
+        "volume": history.volumes[keep],
+        "market_cap": history.market_caps[keep],
+    }
+    if indicators:
+        for name, values in indicator_frame(history, indicators).items():
+            columns[name] = values.to_numpy()[keep]
+    return pa.RecordBatch.from_arrays([pa.array(columns[field.name], field.type) for field in schema], schema=schema)
+
+
+def _wait_for_capacity(coin_id, days, float32):
+    # Histories the hub already holds are read without an upstream call
+    if get_hub().peek(("crypto_history", coin_id, days, float32)) is not None:
+        return
+    # Only CoinGecko is rate limited; wait if the router would ask it first
+    ranked = get_router().rank("history", coin_id, days, float32)
+    if not ranked or ranked[0].name != "coingecko":
+        return
+    deadline = time.monotonic() + CAPACITY_TIMEOUT
+    while spare_capacity("coingecko", RATE_RESERVE) < 1:
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"CoinGecko had no spare capacity for {CAPACITY_TIMEOUT} s")
+        time.sleep(1)
+
+
+def export_history(sink, coin_ids, days=365, indicators=(), fmt="parquet", start=None, end=None,
+                   float32=False, on_progress=None):
+    """
+    Write the histories of `coin_ids` (with the `indicators` columns, names
+    from utils.INDICATORS) to `sink`, a path or binary file object, as
+    Parquet or Arrow IPC. `start`/`end` (dates) trim the rows; `days` is
+    widened to reach back to `start`. Coins that fail to load are skipped.
+    Returns {"rows": ..., "coins": ..., "failed": {coin_id: error}}.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    unknown = set(indicators) - set(INDICATORS)
+    if unknown:
+        raise ValueError(f"Unknown indicators: {', '.join(sorted(unknown))}")
+    start_ms, end_ms = _to_ms(start), _to_ms(end)
+    if start_ms is not None:
+        days = max(days, int(np.ceil((time.time() * 1000 - start_ms) / DAY_MS)))
+
+    schema = export_schema(indicators, float32)
+    writer = pq.ParquetWriter(sink, schema) if fmt == "parquet" else pa.ipc.new_file(sink, schema)
+    summary = {"rows": 0, "coins": 0, "failed": {}}
+    pending, pending_rows = [], 0
+
+    def flush():
+        nonlocal pending, pending_rows
+        if pending:
+            writer.write_table(pa.Table.from_batches(pending, schema))
+        pending, pending_rows = [], 0
+
+    try:
+        for i, coin_id in enumerate(coin_ids):
+            try:
+                _wait_for_capacity(coin_id, days, float32)
+                history = load_crypto_history(coin_id, days, float32)
+                batch = coin_batch(coin_id, history, schema, indicators, start_ms, end_ms)
+            except Exception as e:
+                summary["failed"][coin_id] = str(e)
+            else:
+                pending.append(batch)
+                pending_rows += batch.num_rows
+                summary["rows"] += batch.num_rows
+                summary["coins"] += 1
+                if pending_rows >= CHUNK_ROWS:
+                    flush()
+            if on_progress is not None:
+                on_progress(i + 1, len(coin_ids))
+        flush()
+    finally:
+        writer.close()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    coins = parser.add_mutually_exclusive_group(required=True)
+    coins.add_argument("--coins", help="comma-separated CoinGecko ids")
+    coins.add_argument("--top", type=int, help="the top N coins by market cap")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--start", help="first date to keep, e.g. 2024-01-01")
+    parser.add_argument("--end", help="last date to keep")
+    parser.add_argument("--indicators", default="", help=f"comma-separated: {','.join(INDICATORS)}")
+    parser.add_argument("--format", choices=FORMATS, default="parquet")
+    parser.add_argument("--float32", action="store_true", help="store prices, volumes and market caps as float32")
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    if args.coins:
+        coin_ids = [c.strip() for c in args.coins.split(",") if c.strip()]
+    else:
+        # CoinGecko serves at most 250 coins per markets page
+        pages = range(1, -(-args.top // 250) + 1)
+        coin_ids = [c["id"] for page in pages for c in get_top_coins(250, page=page)][:args.top]
+    indicators = [i.strip() for i in args.indicators.split(",") if i.strip()]
+
+    def progress(done, total):
+        print(f"\r{done}/{total} coins", end="", file=sys.stderr)
+
+    summary = export_history(
+        args.out, coin_ids, args.days, indicators, args.format, args.start, args.end, args.float32, progress
+    )
+    print(file=sys.stderr)
+    print(f"{summary['rows']} rows for {summary['coins']} coins written to {args.out}")
+    for coin_id, error in summary["failed"].items():
+        print(f"skipped {coin_id}: {error}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
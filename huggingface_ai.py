@@ -1,6 +1,7 @@
 import requests
 
 import streamlit as st
+from upstream import REQUEST_TIMEOUT, api_url
 
 # Load Hugging Face API Key from Streamlit secrets
 HF_API_TOKEN = st.secrets["huggingface"]["api_token"]
@@ -21,12 +22,12 @@ def summarize_crypto_trend(coin_name, trend_data):
         "Explain if it's bullish, bearish, or stable, and give a simple reason."
     )
 
-    url = f"https://api-inference.huggingface.co/models/{MODEL}"
+    url = api_url("huggingface", f"/{MODEL}")
     headers = {"Authorization": f"Bearer {HF_API_TOKEN}"}
     payload = {"inputs": prompt, "options": {"wait_for_model": True}}
 
     try:
-        response = requests.post(url, headers=headers, json=payload)
+        response = requests.post(url, headers=headers, json=payload, timeout=REQUEST_TIMEOUT)
         if response.status_code == 200:
             return response.json()[0]["generated_text"]
         else:
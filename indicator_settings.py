@@ -0,0 +1,92 @@
+"""
+Indicator parameter controls shared by the Coin Details and Compare pages.
+
+The choices are kept in st.session_state["indicator_params"], so they carry
+over between the two pages for the rest of the session.
+"""
+import plotly.graph_objs as go
+import streamlit as st
+from plotly.colors import sample_colorscale
+
+from utils import DEFAULT_INDICATORS, RIBBON_WINDOWS
+
+RIBBON_CHOICES = (5, 10, 15, 20, 25, 30, 40, 50, 60, 75, 90, 100, 120, 150, 175, 200)
+RIBBON_TYPES = {"Off": None, "SMA": "sma_ribbon", "EMA": "ema_ribbon"}
+
+# Widget key -> (indicator, argument, default)
+PERIODS = {
+    "rsi_period": ("rsi", "period", 14),
+    "macd_short": ("macd", "span_short", 12),
+    "macd_long": ("macd", "span_long", 26),
+    "macd_signal": ("macd", "span_signal", 9),
+    "sma_window": ("sma", "window", 20),
+    "ema_span": ("ema", "span", 20),
+    "bb_window": ("bollinger", "window", 20),
+    "stoch_window": ("stochastic", "window", 14),
+}
+LABELS = {
+    "rsi_period": "RSI Period",
+    "macd_short": "MACD Fast",
+    "macd_long": "MACD Slow",
+    "macd_signal": "MACD Signal",
+    "sma_window": "SMA Window",
+    "ema_span": "EMA Span",
+    "bb_window": "Bollinger Window",
+    "stoch_window": "Stochastic Window",
+}
+
+
+def indicator_settings():
+    """
+    Render the indicator settings expander and return (names, params, ribbon)
+    for get_indicators; `ribbon` is the chosen ribbon indicator or None.
+    """
+    saved = st.session_state.setdefault("indicator_params", {})
+    with st.expander("🎛️ Indicator Settings"):
+        st.caption("Periods count data points: hours for up to 90 days of history, days beyond that.")
+        cols = st.columns(4)
+        for i, (key, (_, _, default)) in enumerate(PERIODS.items()):
+            with cols[i % 4]:
+                saved[key] = st.number_input(
+                    LABELS[key], min_value=2, max_value=500, value=saved.get(key, default), step=1, key=f"ind_{key}"
+                )
+        cols = st.columns([1, 1, 2])
+        with cols[0]:
+            saved["bb_std"] = st.number_input(
+                "Bollinger Width (σ)", 0.5, 4.0, saved.get("bb_std", 2.0), step=0.5, key="ind_bb_std"
+            )
+        with cols[1]:
+            saved["ribbon"] = st.radio(
+                "Moving Average Ribbon", list(RIBBON_TYPES), index=list(RIBBON_TYPES).index(saved.get("ribbon", "Off")),
+                horizontal=True, key="ind_ribbon"
+            )
+        with cols[2]:
+            saved["windows"] = st.multiselect(
+                "Ribbon Windows", RIBBON_CHOICES, default=saved.get("windows", list(RIBBON_WINDOWS)),
+                disabled=saved["ribbon"] == "Off", key="ind_windows"
+            )
+        if saved["macd_short"] >= saved["macd_long"]:
+            st.warning("The MACD fast span should be shorter than the slow span.")
+
+    params = {}
+    for key, (name, arg, _) in PERIODS.items():
+        params.setdefault(name, {})[arg] = saved[key]
+    params["bollinger"]["num_std"] = saved["bb_std"]
+    names = list(DEFAULT_INDICATORS)
+    ribbon = RIBBON_TYPES[saved["ribbon"]] if saved["windows"] else None
+    if ribbon:
+        names.append(ribbon)
+        params[ribbon] = {"windows": tuple(saved["windows"])}
+    return names, params, ribbon
+
+
+def add_ribbon(fig, dates, indicators, ribbon, **trace_args):
+    """Draw the ribbon's columns on `fig`, shortest window in yellow through to longest in purple."""
+    prefix = ribbon.split("_")[0] + "_"
+    columns = [c for c in indicators.columns if c.startswith(prefix) and c[len(prefix):].isdigit()]
+    colors = sample_colorscale("Viridis", [1 - i / max(len(columns) - 1, 1) for i in range(len(columns))])
+    for column, color in zip(columns, colors):
+        fig.add_trace(go.Scatter(
+            x=dates, y=indicators[column], mode="lines", name=column.replace("_", " ").upper(),
+            line=dict(color=color, width=1), **trace_args
+        ))
@@ -0,0 +1,179 @@
+"""
+Multi-session load test for the dashboard.
+
+Drives N simulated Streamlit sessions through Home -> CoinDetails -> Compare ->
+Portfolio against the local stand-in server (or any upstream given with
+--upstream) and reports throughput, page latency percentiles, upstream call
+counts and the server's memory use. Sessions run in this process through
+Streamlit's AppTest, so this process plays the role of the Streamlit server.
+
+    python -m loadtest.harness --sessions 20 --iterations 5 --latency 150
+"""
+import argparse
+import collections
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+
+from loadtest.stub_server import add_config_arguments, config_from_args, start_stub_server
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["Home", "CoinDetails", "Compare", "Portfolio"]
+SECRETS = {"newsapi": {"api_key": "loadtest"}, "huggingface": {"api_token": "loadtest"}}
+
+
+def memory_usage():
+    """Return (current, peak) resident set size in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            status = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(status["VmRSS"].split()[0]) / 1024, int(status["VmHWM"].split()[0]) / 1024
+    except (OSError, KeyError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return peak, peak
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = collections.defaultdict(list)
+        self.failures = collections.Counter()
+        self.lock = threading.Lock()
+
+    def record(self, page, seconds, failed):
+        with self.lock:
+            self.latencies[page].append(seconds)
+            if failed:
+                self.failures[page] += 1
+
+
+def _run_page(recorder, page, script, state=None, click_button=None, timeout=120):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(APP_DIR, script), default_timeout=timeout)
+    for section, values in SECRETS.items():
+        at.secrets[section] = values
+    for key, value in (state or {}).items():
+        at.session_state[key] = value
+    start = time.perf_counter()
+    at.run()
+    if click_button is not None and not at.exception:
+        # Time the interaction that renders the page's content, not the empty form
+        start = time.perf_counter()
+        at.button[click_button].click().run()
+    failed = bool(at.exception) or bool(at.error)
+    recorder.record(page, time.perf_counter() - start, failed)
+
+
+def run_session(recorder, coin_ids, iterations, seed):
+    rng = random.Random(seed)
+    for _ in range(iterations):
+        coin_id = rng.choice(coin_ids)
+        _run_page(recorder, "Home", "Home.py")
+        _run_page(recorder, "CoinDetails", "pages/CoinDetails.py", {"selected_coin": coin_id})
+        _run_page(recorder, "Compare", "pages/Compare.py", click_button=0)
+        _run_page(recorder, "Portfolio", "pages/Portfolio.py", {
+            "loaded_portfolio": True,
+            "watchlist": [coin_id],
+            "portfolio": [{"id": coin_id, "name": coin_id, "symbol": coin_id.upper(), "quantity": 1.0, "avg_price": 10.0}],
+            "alerts": {}, "alerts_rsi": {}, "alerts_macd": {},
+        })
+
+
+def upstream_stats(server, upstream):
+    if server is not None:
+        return server.stats()
+    with urlopen(upstream.rstrip("/") + "/__stats") as response:
+        return json.load(response)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent simulated sessions")
+    parser.add_argument("--iterations", type=int, default=3, help="page cycles per session")
+    parser.add_argument("--coins", type=int, default=10, help="number of distinct coins sessions open")
+    parser.add_argument("--upstream", help="base URL of an already running stub server")
+    parser.add_argument("--json", help="also write the report to this file")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    if args.upstream:
+        base = args.upstream.rstrip("/")
+        env = {
+            "COINGECKO_API_URL": f"{base}/api/v3",
+            "BINANCE_API_URL": f"{base}/api/v3",
+            "NEWSAPI_URL": f"{base}/v2",
+            "HF_INFERENCE_URL": f"{base}/models",
+        }
+    else:
+        server = start_stub_server(config_from_args(args))
+        env = server.env()
+    # Must happen before the app modules are imported by the first session
+    os.environ.update(env)
+    sys.path.insert(0, APP_DIR)
+
+    recorder = Recorder()
+    coin_ids = [f"coin-{i}" for i in range(args.coins)]
+    rss_before, _ = memory_usage()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        futures = [pool.submit(run_session, recorder, coin_ids, args.iterations, seed) for seed in range(args.sessions)]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+    rss, rss_peak = memory_usage()
+    from data_hub import get_hub
+
+    pages_served = sum(len(v) for v in recorder.latencies.values())
+    report = {
+        "sessions": args.sessions,
+        "iterations": args.iterations,
+        "elapsed_s": round(elapsed, 3),
+        "pages_per_s": round(pages_served / elapsed, 2),
+        "pages": {
+            page: {
+                "count": len(recorder.latencies[page]),
+                "failures": recorder.failures[page],
+                "p50_ms": round(percentile(recorder.latencies[page], 50) * 1000, 1),
+                "p95_ms": round(percentile(recorder.latencies[page], 95) * 1000, 1),
+                "p99_ms": round(percentile(recorder.latencies[page], 99) * 1000, 1),
+            }
+            for page in PAGES
+        },
+        "upstream_calls": upstream_stats(server, args.upstream),
+        "cache": get_hub().stats(),
+        "rss_mb": {"start": round(rss_before, 1), "end": round(rss, 1), "peak": round(rss_peak, 1)},
+    }
+
+    print(f"{args.sessions} sessions x {args.iterations} iterations in {elapsed:.1f}s "
+          f"({report['pages_per_s']} pages/s)")
+    print(f"{'page':<12}{'count':>7}{'fail':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for page, row in report["pages"].items():
+        print(f"{page:<12}{row['count']:>7}{row['failures']:>6}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+    print("upstream calls:", ", ".join(f"{k}={v}" for k, v in sorted(report["upstream_calls"].items())))
+    print("cache:", ", ".join(
+        f"{name} {row['hits']}/{row['misses']}/{row['evictions']} ({row['bytes'] / 2**20:.1f} MB)"
+        for name, row in sorted(report["cache"].items())
+    ), "[hits/misses/evictions]")
+    print("server RSS (MB): start {start}, end {end}, peak {peak}".format(**report["rss_mb"]))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
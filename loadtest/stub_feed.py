@@ -0,0 +1,54 @@
+"""
+Local stand-in for the CoinCap websocket price feed.
+
+Clients connect to ws://host:port/prices?assets=coin-1,coin-2 and receive
+random-walk ticks in the same format as the real feed ({"coin-1": "12.34"}).
+Point the app at it with PRICE_STREAM_URL=ws://127.0.0.1:8766/prices.
+
+    python -m loadtest.stub_feed --interval 0.5
+"""
+import argparse
+import asyncio
+import json
+import random
+from urllib.parse import parse_qs, urlparse
+
+
+async def _feed(ws, interval, seed):
+    from websockets.exceptions import ConnectionClosed
+
+    query = parse_qs(urlparse(ws.request.path).query)
+    assets = [a for a in query.get("assets", [""])[0].split(",") if a]
+    rng = random.Random(seed)
+    prices = {asset: 10.0 + rng.random() * 100 for asset in assets}
+    try:
+        while True:
+            # Like the real feed, each message carries only the coins that moved
+            moved = rng.sample(assets, k=max(1, len(assets) // 2)) if assets else []
+            for asset in moved:
+                prices[asset] *= 1 + rng.gauss(0, 0.002)
+            await ws.send(json.dumps({asset: f"{prices[asset]:.6f}" for asset in moved}))
+            await asyncio.sleep(interval)
+    except ConnectionClosed:
+        pass
+
+
+async def serve(host, port, interval, seed=0):
+    from websockets.asyncio.server import serve as ws_serve
+
+    async with ws_serve(lambda ws: _feed(ws, interval, seed), host, port):
+        await asyncio.get_running_loop().create_future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between ticks")
+    args = parser.parse_args()
+    print(f"PRICE_STREAM_URL=ws://{args.host}:{args.port}/prices")
+    asyncio.run(serve(args.host, args.port, args.interval))
+
+
+if __name__ == "__main__":
+    main()
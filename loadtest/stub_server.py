@@ -0,0 +1,287 @@
+"""
+Local stand-in for the CoinGecko, Binance klines, NewsAPI and Hugging Face
+inference endpoints.
+
+Serves deterministic synthetic data with configurable latency, error rate and
+rate limiting, and counts every call so load tests can report upstream usage.
+Point the app at it with:
+
+    COINGECKO_API_URL=http://127.0.0.1:8765/api/v3
+    BINANCE_API_URL=http://127.0.0.1:8765/api/v3
+    NEWSAPI_URL=http://127.0.0.1:8765/v2
+    HF_INFERENCE_URL=http://127.0.0.1:8765/models
+
+Run standalone with `python -m loadtest.stub_server --latency 150 --rate-limit 0.05`.
+GET /__stats returns the call counts, GET /__reset clears them.
+"""
+import argparse
+import collections
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+COIN_COUNT = 250
+POINTS_PER_DAY = 24
+BASE_TIMESTAMP_MS = 1_700_000_000_000
+
+
+class StubError(Exception):
+    def __init__(self, status, body):
+        super().__init__(status)
+        self.status = status
+        self.body = body
+
+
+class StubConfig:
+    def __init__(self, latency_ms=50.0, jitter_ms=20.0, error_rate=0.0, rate_limit=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+
+
+def _coin(index):
+    return {"id": f"coin-{index}", "symbol": f"c{index}", "name": f"Coin {index}"}
+
+
+def _price_path(index, count, step_ms, end_ms):
+    # Cheap deterministic random walk so every coin has its own shape
+    rng = random.Random(index)
+    price = 10.0 + index * 3.7
+    points = []
+    for i in range(count):
+        price *= 1 + rng.gauss(0, 0.01)
+        points.append([end_ms - (count - 1 - i) * step_ms, round(price, 6)])
+    return points
+
+
+def markets(params):
+    per_page = int(params.get("per_page", ["100"])[0])
+    first = (int(params.get("page", ["1"])[0]) - 1) * per_page
+    coins = []
+    for i in range(first, min(first + per_page, COIN_COUNT)):
+        price = _price_path(i, 1, 1, BASE_TIMESTAMP_MS)[0][1]
+        coins.append(dict(
+            _coin(i),
+            current_price=price,
+            market_cap=round(price * 1e7 * (COIN_COUNT - i)),
+            total_volume=round(price * 1e5 * (COIN_COUNT - i)),
+            market_cap_rank=i + 1,
+            price_change_percentage_24h=round(math.sin(i) * 5, 3),
+        ))
+        if params.get("sparkline", ["false"])[0].lower() == "true":
+            # Hourly prices over 7 days, like CoinGecko's sparkline_in_7d
+            hourly = _price_path(i, 7 * POINTS_PER_DAY, 3_600_000, BASE_TIMESTAMP_MS)
+            coins[-1]["sparkline_in_7d"] = {"price": [p for _, p in hourly]}
+    return coins
+
+
+def coin_details(coin_id):
+    index = int(coin_id.rsplit("-", 1)[-1])
+    price = _price_path(index, 1, 1, BASE_TIMESTAMP_MS)[0][1]
+    currencies = ["usd", "eur", "gbp", "inr", "cad", "jpy", "aud", "chf"]
+    return dict(
+        _coin(index),
+        # Bulk fields similar in size to the real response
+        description={"en": "Lorem ipsum dolor sit amet. " * 200},
+        links={"homepage": [f"https://coin-{index}.example"] * 3, "blockchain_site": ["https://explorer.example"] * 10},
+        market_data={
+            "current_price": {c: price for c in currencies},
+            "market_cap": {c: price * 1e7 for c in currencies},
+            "total_volume": {c: price * 1e5 for c in currencies},
+            "ath": {c: price * 2 for c in currencies},
+            "ath_change_percentage": {c: -50.0 for c in currencies},
+            "circulating_supply": 1e7,
+            "total_supply": 2e7,
+            "max_supply": None,
+            "price_change_percentage_24h": round(math.sin(index) * 5, 3),
+        },
+    )
+
+
+def market_chart(coin_id, params):
+    index = int(coin_id.rsplit("-", 1)[-1])
+    days = int(params.get("days", ["30"])[0])
+    prices = _price_path(index, days * POINTS_PER_DAY, 3_600_000, BASE_TIMESTAMP_MS)
+    return {
+        "prices": prices,
+        "total_volumes": [[ts, p * 1e5] for ts, p in prices],
+        "market_caps": [[ts, p * 1e7] for ts, p in prices],
+    }
+
+
+KLINE_INTERVALS = {"5m": 300_000, "1h": 3_600_000, "4h": 14_400_000, "1d": 86_400_000}
+
+
+def klines(params):
+    # Binance symbols of the stub coins are C<index>USDT
+    match = re.match(r"^C(\d+)USDT$", params.get("symbol", [""])[0])
+    if not match or int(match.group(1)) >= COIN_COUNT:
+        raise StubError(400, {"code": -1121, "msg": "Invalid symbol."})
+    step = KLINE_INTERVALS[params.get("interval", ["1h"])[0]]
+    limit = min(int(params.get("limit", ["500"])[0]), 1000)
+    # Like Binance: klines from startTime on, else the latest ones, the last still open
+    now = int(time.time() * 1000)
+    end = now - now % step
+    if "startTime" in params:
+        first = -(-int(params["startTime"][0]) // step) * step
+        limit = max(min(limit, (end - first) // step + 1), 0)
+        end = first + (limit - 1) * step
+    rows = []
+    for open_time, close in _price_path(int(match.group(1)), limit, step, end):
+        rows.append([
+            open_time, str(close), str(close * 1.01), str(close * 0.99), str(close), "1000.0",
+            open_time + step - 1, str(close * 1000 * step / 86_400_000), 100, "500.0", str(close * 500), "0",
+        ])
+    return rows
+
+
+def news(params):
+    query = params.get("q", ["crypto"])[0]
+    size = int(params.get("pageSize", ["5"])[0])
+    return {"status": "ok", "articles": [
+        {
+            "title": f"{query} surges as traders eye record {i}",
+            "url": f"https://news.example/{i}",
+            "source": {"name": "Stub News"},
+            "publishedAt": "2024-01-01T00:00:00Z",
+        }
+        for i in range(size)
+    ]}
+
+
+ROUTES = [
+    ("GET", re.compile(r"^/api/v3/coins/markets$"), "markets", lambda m, q: markets(q)),
+    ("GET", re.compile(r"^/api/v3/coins/(coin-\d+)/market_chart$"), "market_chart", lambda m, q: market_chart(m.group(1), q)),
+    ("GET", re.compile(r"^/api/v3/coins/(coin-\d+)$"), "coin", lambda m, q: coin_details(m.group(1))),
+    ("GET", re.compile(r"^/api/v3/klines$"), "klines", lambda m, q: klines(q)),
+    ("GET", re.compile(r"^/v2/everything$"), "news", lambda m, q: news(q)),
+    ("POST", re.compile(r"^/models/.+$"), "inference", lambda m, q: [{"generated_text": "The price shows a steady uptrend, bullish."}]),
+]
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        super().__init__(address, StubHandler)
+        self.config = config
+        self.counts = collections.Counter()
+        self.counts_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        """Environment variables that point the app at this server."""
+        return {
+            "COINGECKO_API_URL": f"{self.base_url}/api/v3",
+            "BINANCE_API_URL": f"{self.base_url}/api/v3",
+            "NEWSAPI_URL": f"{self.base_url}/v2",
+            "HF_INFERENCE_URL": f"{self.base_url}/models",
+        }
+
+    def stats(self):
+        with self.counts_lock:
+            return dict(self.counts)
+
+    def reset(self):
+        with self.counts_lock:
+            self.counts.clear()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        self._handle("POST")
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, method):
+        parsed = urlparse(self.path)
+        params = parse_qs(parsed.query)
+        server = self.server
+        if parsed.path == "/__stats":
+            return self._send(200, server.stats())
+        if parsed.path == "/__reset":
+            server.reset()
+            return self._send(200, {})
+
+        for route_method, pattern, name, handler in ROUTES:
+            match = pattern.match(parsed.path)
+            if route_method == method and match:
+                break
+        else:
+            return self._send(404, {"error": "not found"})
+
+        config = server.config
+        with server.counts_lock:
+            server.counts[name] += 1
+            roll = config.random.random()
+            delay = max(0.0, config.random.gauss(config.latency_ms, config.jitter_ms)) / 1000
+        time.sleep(delay)
+        if roll < config.rate_limit:
+            return self._send(429, {"status": {"error_code": 429, "error_message": "rate limited"}})
+        if roll < config.rate_limit + config.error_rate:
+            return self._send(500, {"error": "internal error"})
+        try:
+            self._send(200, handler(match, params))
+        except StubError as e:
+            self._send(e.status, e.body)
+
+
+def start_stub_server(config=None, host="127.0.0.1", port=0):
+    """Start the server on a background thread; port 0 picks a free port."""
+    server = StubServer((host, port), config or StubConfig())
+    threading.Thread(target=server.serve_forever, name="stub-server", daemon=True).start()
+    return server
+
+
+def add_config_arguments(parser):
+    parser.add_argument("--latency", type=float, default=50.0, help="mean upstream latency in ms")
+    parser.add_argument("--jitter", type=float, default=20.0, help="latency standard deviation in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 500")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of calls answered with 429")
+
+
+def config_from_args(args):
+    return StubConfig(args.latency, args.jitter, args.error_rate, args.rate_limit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    server = StubServer((args.host, args.port), config_from_args(args))
+    for name, value in server.env().items():
+        print(f"{name}={value}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
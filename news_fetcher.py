@@ -1,13 +1,11 @@
-import requests
 import streamlit as st
+from data_hub import get_hub
+from upstream import api_url, get_json
 
-def fetch_crypto_news(coin_name, max_articles=5):
-    """
-    Fetch latest news headlines for a given cryptocurrency using NewsAPI.org.
-    (You need to add your NewsAPI key to Streamlit secrets as newsapi.api_key)
-    """
-    api_key = st.secrets["newsapi"]["api_key"]
-    url = "https://newsapi.org/v2/everything"
+NEWS_TTL = 900
+
+def _fetch_news(coin_name, max_articles, api_key):
+    url = api_url("newsapi", "/everything")
     params = {
         "q": coin_name,
         "language": "en",
@@ -15,11 +13,25 @@ def fetch_crypto_news(coin_name, max_articles=5):
         "pageSize": max_articles,
         "apiKey": api_key
     }
-    resp = requests.get(url, params=params)
-    if resp.status_code == 200:
-        return resp.json().get("articles", [])
-    else:
-        st.warning(f"NewsAPI error: {resp.status_code} - {resp.text}")
+    return get_json("newsapi", url, params=params).get("articles", [])
+
+def fetch_crypto_news(coin_name, max_articles=5):
+    """
+    Fetch latest news headlines for a given cryptocurrency using NewsAPI.org.
+    (You need to add your NewsAPI key to Streamlit secrets as newsapi.api_key)
+    Served from the shared data hub, so an outage shows the last headlines fetched.
+    """
+    api_key = st.secrets["newsapi"]["api_key"]
+    try:
+        return get_hub().get(
+            ("news", coin_name, max_articles),
+            lambda: _fetch_news(coin_name, max_articles, api_key),
+            ttl=NEWS_TTL,
+            # NewsAPI's free plan has a daily quota; fetch only when someone reads the news
+            refresh=False
+        )
+    except Exception as e:
+        st.warning(f"NewsAPI error: {e}")
     return []
 
 def simple_sentiment(text):
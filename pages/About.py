@@ -8,13 +8,14 @@ page_map = {
     "Portfolio": "pages/Portfolio.py",
     "Coin Details": "pages/CoinDetails.py",
     "Compare": "pages/Compare.py",
+    "Export": "pages/Export.py",
     "Settings": "pages/Settings.py",
     "About": "pages/About.py"
 }
 nav = st.sidebar.radio(
     "Navigate",
     list(page_map.keys()),
-    index=5
+    index=6
 )
 if nav != "About":
     st.switch_page(page_map[nav])
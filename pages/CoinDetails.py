@@ -1,8 +1,13 @@
+import requests
 import streamlit as st
-import pandas as pd
 import plotly.graph_objs as go
-from data_fetcher import get_coin_details, get_crypto_history
-from utils import calculate_rsi, calculate_macd, calculate_sma, calculate_ema, calculate_bollinger_bands, calculate_stochastic_oscillator
+from plotly.subplots import make_subplots
+from data_fetcher import get_coin_details, get_crypto_history, get_indicators, stale_data_age
+from upstream import REQUEST_TIMEOUT, api_url
+from price_stream import RENDER_INTERVAL, get_stream
+from candles import get_rollup
+from data_hub import get_hub
+from indicator_settings import add_ribbon, indicator_settings
 
 """
 This module displays detailed information and technical/AI analysis for a selected cryptocurrency.
@@ -15,6 +20,7 @@ page_map = {
     "Portfolio": "pages/Portfolio.py",
     "Coin Details": "pages/CoinDetails.py",
     "Compare": "pages/Compare.py",
+    "Export": "pages/Export.py",
     "Settings": "pages/Settings.py",
     "About": "pages/About.py"
 }
@@ -31,108 +37,215 @@ currency = st.session_state.get("currency", "usd")  # default to USD
 refresh_interval = st.session_state.get("refresh", 180)
 
 st.sidebar.header("⚙️ Settings")
-days = st.sidebar.slider("Price History (days)", 30, 180, 60, step=10)
+# Only the refresh interval stays in the sidebar: it reschedules every section,
+# while the day range lives inside the charts section so it reruns nothing else
 refresh_interval = st.sidebar.slider("Auto-Refresh (sec)", 60, 600, 180, step=60)
+stream = get_stream() if st.session_state.get("live_stream", False) else None
+
+DEFAULT_DAYS = 60
+NEWS_REFRESH = 900
+AI_REFRESH = 900
 
 coin_id = st.session_state.get("selected_coin", None)
 if not coin_id:
     st.error("No coin selected. Go back to Home.")
     st.stop()
 
-@st.cache_data(ttl=refresh_interval)
 def load_data(coin_id, days):
+    # Both come from the shared hub; the frame is a zero-copy view of the history
     coin = get_coin_details(coin_id)
     history = get_crypto_history(coin_id, days)
-    df = pd.DataFrame(history["prices"], columns=["timestamp", "price"])
-    df["Date"] = pd.to_datetime(df["timestamp"], unit="ms")
-    return coin, df
+    return coin, history, history.to_frame()
 
-try:
-    coin, df = load_data(coin_id, days)
-    st.title(f"📈 {coin['name']} ({coin['symbol'].upper()})")
+def technical_signal(current_rsi, macd_diff):
+    tech_icon = "🟡"
+    tech_text = "Hold"
+    tech_reason = "RSI and MACD suggest a neutral state."
+    if current_rsi > 70:
+        tech_icon = "🔴"
+        tech_text = "Sell"
+        tech_reason = f"RSI is {current_rsi:.2f} (Overbought), MACD is below signal → bearish trend."
+    elif current_rsi < 30:
+        tech_icon = "🟢"
+        tech_text = "Buy"
+        tech_reason = f"RSI is {current_rsi:.2f} (Oversold), may rebound soon."
+    elif macd_diff > 0.001:
+        tech_icon = "🟢"
+        tech_text = "Buy"
+        tech_reason = "MACD is above the signal → bullish trend."
+    elif macd_diff < -0.001:
+        tech_icon = "🔴"
+        tech_text = "Sell"
+        tech_reason = "MACD is below the signal → bearish trend."
+    return tech_icon, tech_text, tech_reason
+
+def fetch_ai_summary(coin_id, coin_name):
+    price_table = get_crypto_history(coin_id, DEFAULT_DAYS).to_frame()[["Date", "price"]].tail(10).to_string(index=False)
+    ai_prompt = f"""
+Crypto: {coin_name}
+Last 10 days of price data:\n{price_table}
+Task: Summarize the recent price trend and recommend a short-term action.
+Explain your reasoning in 1-2 lines.
+"""
+    hf_url = api_url("huggingface", "/mistralai/Mistral-7B-Instruct-v0.1")
+    headers = {"Authorization": f"Bearer {st.secrets['huggingface']['api_token']}"}
+    resp = requests.post(hf_url, headers=headers, json={"inputs": ai_prompt}, timeout=REQUEST_TIMEOUT)
+    if resp.status_code != 200:
+        raise Exception("AI API failed")
+    return resp.json()[0]["generated_text"]
+
+# Each section below is a fragment with explicit inputs: a widget inside one
+# section reruns only that section, and the data-heavy sections refresh on
+# their own schedules. Everything they read is cached in the shared hub.
+
+@st.fragment
+def market_analysis(coin_id):
+    try:
+        days = st.slider("Price History (days)", 30, 180, DEFAULT_DAYS, step=10, key="details_days")
+        coin, history, df = load_data(coin_id, days)
+
+        # The price widget and chart rerun on their own on the refresh interval
+        # (every second while streaming) without recomputing the rest of the page
+        @st.fragment(run_every=RENDER_INTERVAL if stream else refresh_interval)
+        def price_movement(coin_id, days):
+            coin, history, df = load_data(coin_id, days)
+            fig = go.Figure()
+            fig.add_trace(go.Scatter(x=df["Date"], y=df["price"], mode="lines", name="Price"))
+            price, label = coin.current_price, "💰 Current Price"
+            if stream:
+                stream.track([coin_id])
+                tick_times, tick_prices = stream.ticks(coin_id)
+                if len(tick_prices):
+                    price, label = tick_prices[-1], "💰 Current Price 🔴 live"
+                    fig.add_trace(go.Scatter(x=tick_times.view("datetime64[ms]"), y=tick_prices, mode="lines", name="Live", line=dict(color="red")))
+            change = coin.price_change_percentage_24h
+            st.metric(label, f"${price:,.2f}", f"{change:.2f}% (24h)" if change is not None else None)
+            fig.update_layout(title=f"{days}-Day Price Chart", xaxis_title="Date", yaxis_title="Price (USD)")
+            st.plotly_chart(fig, use_container_width=True)
+
+        st.subheader("📉 Price Movement")
+        price_movement(coin_id, days)
+
+        @st.fragment(run_every=RENDER_INTERVAL if stream else refresh_interval)
+        def candle_chart(coin_id, days):
+            history = get_crypto_history(coin_id, days)
+            rollup = get_rollup(coin_id, days, history)
+            if stream:
+                rollup.add_ticks(*stream.ticks(coin_id))
+            options = rollup.available()
+            timeframe = st.segmented_control(
+                "Timeframe", options, default="1h" if "1h" in options else options[0], key="candle_timeframe"
+            ) or options[0]
+            bars = rollup.candles(timeframe)
+            candle_fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.75, 0.25], vertical_spacing=0.03)
+            candle_fig.add_trace(go.Candlestick(
+                x=bars["Date"], open=bars["open"], high=bars["high"], low=bars["low"], close=bars["close"], name="OHLC"
+            ), row=1, col=1)
+            candle_fig.add_trace(go.Bar(x=bars["Date"], y=bars["volume"], name="Volume (est.)", marker_color="gray"), row=2, col=1)
+            candle_fig.update_layout(
+                title=f"{timeframe} Candles", yaxis_title="Price (USD)", yaxis2_title="Volume",
+                xaxis_rangeslider_visible=False, showlegend=False, height=500
+            )
+            st.plotly_chart(candle_fig, use_container_width=True)
 
-    st.subheader("📉 Price Movement")
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=df["Date"], y=df["price"], mode="lines", name="Price"))
-    fig.update_layout(title=f"{days}-Day Price Chart", xaxis_title="Date", yaxis_title="Price (USD)")
-    st.plotly_chart(fig, use_container_width=True)
+        st.subheader("🕯️ Candlesticks & Volume")
+        candle_chart(coin_id, days)
 
-    st.subheader("📊 Technical Indicators")
+        st.subheader("📊 Technical Indicators")
+        names, params, ribbon = indicator_settings()
 
         # --- RSI ---
-    rsi = calculate_rsi(df["price"])
-    current_rsi = rsi.dropna().iloc[-1]
-    st.markdown("### 📈 RSI (Relative Strength Index)")
-    st.markdown(f"**RSI: {current_rsi:.2f}**")
-    if current_rsi > 70:
-        st.markdown("🟥 RSI Analysis: Overbought. Consider caution.")
-    elif current_rsi < 30:
-        st.markdown("🟩 RSI Analysis: Oversold. Might be a buying opportunity.")
-    else:
-        st.markdown("🟦 RSI Analysis: Neutral. Hold position.")
-    rsi_fig = go.Figure()
-    rsi_fig.add_trace(go.Scatter(x=df["Date"], y=rsi, mode="lines", name="RSI"))
-    rsi_fig.add_hline(y=70, line_color="red", line_dash="dash")
-    rsi_fig.add_hline(y=30, line_color="green", line_dash="dash")
-    rsi_fig.update_layout(title="RSI Over Time", yaxis_title="RSI", xaxis_title="Date", height=300)
-    st.plotly_chart(rsi_fig, use_container_width=True)
-
-    # --- MACD ---
-    macd, signal = calculate_macd(df["price"])
-    macd_value = macd.iloc[-1]
-    signal_value = signal.iloc[-1]
-    macd_diff = macd_value - signal_value
-    st.markdown("### 📊 MACD (Moving Average Convergence Divergence)")
-    st.markdown(f"**MACD: {macd_value:.4f} | Signal: {signal_value:.4f}**")
-    if abs(macd_diff) < 0.001:
-        st.markdown("⚪ MACD Analysis: Neutral — MACD and signal are almost equal.")
-    elif macd_diff > 0:
-        st.markdown("🟢 MACD is above the signal line → bullish momentum.")
-    else:
-        st.markdown("🔴 MACD is below the signal line → bearish momentum.")
-    macd_fig = go.Figure()
-    macd_fig.add_trace(go.Scatter(x=df["Date"], y=macd, mode="lines", name="MACD", line=dict(color="orange")))
-    macd_fig.add_trace(go.Scatter(x=df["Date"], y=signal, mode="lines", name="Signal", line=dict(color="blue", dash="dot")))
-    macd_fig.update_layout(title="MACD Over Time", yaxis_title="MACD", xaxis_title="Date", height=300)
-    st.plotly_chart(macd_fig, use_container_width=True)
-
-    # --- SMA & EMA ---
-    sma = calculate_sma(df["price"])
-    ema = calculate_ema(df["price"])
-    st.markdown("### 📏 SMA & EMA (Moving Averages)")
-    ma_fig = go.Figure()
-    ma_fig.add_trace(go.Scatter(x=df["Date"], y=df["price"], mode="lines", name="Price", line=dict(color="gray")))
-    ma_fig.add_trace(go.Scatter(x=df["Date"], y=sma, mode="lines", name="SMA", line=dict(color="blue")))
-    ma_fig.add_trace(go.Scatter(x=df["Date"], y=ema, mode="lines", name="EMA", line=dict(color="purple", dash="dot")))
-    ma_fig.update_layout(title="SMA & EMA Over Time", yaxis_title="Price", xaxis_title="Date", height=300)
-    st.plotly_chart(ma_fig, use_container_width=True)
-
-    # --- Bollinger Bands ---
-    sma_bb, upper_band, lower_band = calculate_bollinger_bands(df["price"])
-    st.markdown("### 📉 Bollinger Bands")
-    bb_fig = go.Figure()
-    bb_fig.add_trace(go.Scatter(x=df["Date"], y=df["price"], mode="lines", name="Price", line=dict(color="gray")))
-    bb_fig.add_trace(go.Scatter(x=df["Date"], y=upper_band, mode="lines", name="Upper Band", line=dict(color="green", dash="dot")))
-    bb_fig.add_trace(go.Scatter(x=df["Date"], y=lower_band, mode="lines", name="Lower Band", line=dict(color="red", dash="dot")))
-    bb_fig.add_trace(go.Scatter(x=df["Date"], y=sma_bb, mode="lines", name="SMA", line=dict(color="blue")))
-    bb_fig.update_layout(title="Bollinger Bands", yaxis_title="Price", xaxis_title="Date", height=300)
-    st.plotly_chart(bb_fig, use_container_width=True)
-
-    # --- Stochastic Oscillator ---
-    stoch_k = calculate_stochastic_oscillator(df["price"])
-    st.markdown("### ⚡ Stochastic Oscillator")
-    stoch_fig = go.Figure()
-    stoch_fig.add_trace(go.Scatter(x=df["Date"], y=stoch_k, mode="lines", name="%K (Stochastic)"))
-    stoch_fig.add_hline(y=80, line_color="red", line_dash="dash")
-    stoch_fig.add_hline(y=20, line_color="green", line_dash="dash")
-    stoch_fig.update_layout(title="Stochastic Oscillator", yaxis_title="%K", xaxis_title="Date", height=300)
-    st.plotly_chart(stoch_fig, use_container_width=True)
-
-    # Key Metrics
-    # --- News & Sentiment ---
+        indicators = get_indicators(coin_id, days, names, params)
+        rsi = indicators["rsi"]
+        current_rsi = rsi.dropna().iloc[-1]
+        st.markdown("### 📈 RSI (Relative Strength Index)")
+        st.markdown(f"**RSI: {current_rsi:.2f}**")
+        if current_rsi > 70:
+            st.markdown("🟥 RSI Analysis: Overbought. Consider caution.")
+        elif current_rsi < 30:
+            st.markdown("🟩 RSI Analysis: Oversold. Might be a buying opportunity.")
+        else:
+            st.markdown("🟦 RSI Analysis: Neutral. Hold position.")
+        rsi_fig = go.Figure()
+        rsi_fig.add_trace(go.Scatter(x=df["Date"], y=rsi, mode="lines", name="RSI"))
+        rsi_fig.add_hline(y=70, line_color="red", line_dash="dash")
+        rsi_fig.add_hline(y=30, line_color="green", line_dash="dash")
+        rsi_fig.update_layout(title=f"RSI ({params['rsi']['period']}) Over Time", yaxis_title="RSI", xaxis_title="Date", height=300)
+        st.plotly_chart(rsi_fig, use_container_width=True)
+
+        # --- MACD ---
+        macd, signal = indicators["macd"], indicators["signal"]
+        macd_value = macd.iloc[-1]
+        signal_value = signal.iloc[-1]
+        macd_diff = macd_value - signal_value
+        st.markdown("### 📊 MACD (Moving Average Convergence Divergence)")
+        st.markdown(f"**MACD: {macd_value:.4f} | Signal: {signal_value:.4f}**")
+        if abs(macd_diff) < 0.001:
+            st.markdown("⚪ MACD Analysis: Neutral — MACD and signal are almost equal.")
+        elif macd_diff > 0:
+            st.markdown("🟢 MACD is above the signal line → bullish momentum.")
+        else:
+            st.markdown("🔴 MACD is below the signal line → bearish momentum.")
+        macd_fig = go.Figure()
+        macd_fig.add_trace(go.Scatter(x=df["Date"], y=macd, mode="lines", name="MACD", line=dict(color="orange")))
+        macd_fig.add_trace(go.Scatter(x=df["Date"], y=signal, mode="lines", name="Signal", line=dict(color="blue", dash="dot")))
+        spans = params["macd"]
+        macd_fig.update_layout(title=f"MACD ({spans['span_short']}/{spans['span_long']}/{spans['span_signal']}) Over Time", yaxis_title="MACD", xaxis_title="Date", height=300)
+        st.plotly_chart(macd_fig, use_container_width=True)
+
+        # --- SMA & EMA ---
+        sma, ema = indicators["sma"], indicators["ema"]
+        st.markdown("### 📏 SMA & EMA (Moving Averages)")
+        ma_fig = go.Figure()
+        ma_fig.add_trace(go.Scatter(x=df["Date"], y=df["price"], mode="lines", name="Price", line=dict(color="gray")))
+        ma_fig.add_trace(go.Scatter(x=df["Date"], y=sma, mode="lines", name=f"SMA ({params['sma']['window']})", line=dict(color="blue")))
+        ma_fig.add_trace(go.Scatter(x=df["Date"], y=ema, mode="lines", name=f"EMA ({params['ema']['span']})", line=dict(color="purple", dash="dot")))
+        if ribbon:
+            add_ribbon(ma_fig, df["Date"], indicators, ribbon)
+        ma_fig.update_layout(title="SMA & EMA Over Time", yaxis_title="Price", xaxis_title="Date", height=450 if ribbon else 300)
+        st.plotly_chart(ma_fig, use_container_width=True)
+
+        # --- Bollinger Bands ---
+        sma_bb, upper_band, lower_band = indicators["bb_mid"], indicators["bb_upper"], indicators["bb_lower"]
+        st.markdown("### 📉 Bollinger Bands")
+        bb_fig = go.Figure()
+        bb_fig.add_trace(go.Scatter(x=df["Date"], y=df["price"], mode="lines", name="Price", line=dict(color="gray")))
+        bb_fig.add_trace(go.Scatter(x=df["Date"], y=upper_band, mode="lines", name="Upper Band", line=dict(color="green", dash="dot")))
+        bb_fig.add_trace(go.Scatter(x=df["Date"], y=lower_band, mode="lines", name="Lower Band", line=dict(color="red", dash="dot")))
+        bb_fig.add_trace(go.Scatter(x=df["Date"], y=sma_bb, mode="lines", name="SMA", line=dict(color="blue")))
+        bb_fig.update_layout(title="Bollinger Bands", yaxis_title="Price", xaxis_title="Date", height=300)
+        st.plotly_chart(bb_fig, use_container_width=True)
+
+        # --- Stochastic Oscillator ---
+        stoch_k = indicators["stoch_k"]
+        st.markdown("### ⚡ Stochastic Oscillator")
+        stoch_fig = go.Figure()
+        stoch_fig.add_trace(go.Scatter(x=df["Date"], y=stoch_k, mode="lines", name="%K (Stochastic)"))
+        stoch_fig.add_hline(y=80, line_color="red", line_dash="dash")
+        stoch_fig.add_hline(y=20, line_color="green", line_dash="dash")
+        stoch_fig.update_layout(title="Stochastic Oscillator", yaxis_title="%K", xaxis_title="Date", height=300)
+        st.plotly_chart(stoch_fig, use_container_width=True)
+
+        tech_icon, tech_text, tech_reason = technical_signal(current_rsi, macd_diff)
+        st.markdown("<div class='card'>", unsafe_allow_html=True)
+        st.markdown(f"<h4>⚙️ Based on Technical Analysis: {tech_icon} <b>{tech_text}</b></h4>", unsafe_allow_html=True)
+        st.caption(f"💬 {tech_reason}")
+        st.markdown("</div>", unsafe_allow_html=True)
+
+        # The final recommendation depends on this verdict: rerun the page only when it changed
+        signals = st.session_state.setdefault("tech_signal", {})
+        previous = signals.get(coin_id)
+        signals[coin_id] = (tech_icon, tech_text)
+        if previous is not None and previous != signals[coin_id]:
+            st.rerun()
+    except Exception as e:
+        st.error(f"❌ Failed to load coin data: {e}")
+
+@st.fragment(run_every=NEWS_REFRESH)
+def latest_news(coin_name):
     from news_fetcher import fetch_crypto_news, simple_sentiment
     st.subheader("📰 Latest News & Sentiment")
-    news = fetch_crypto_news(coin['name'])
+    news = fetch_crypto_news(coin_name)
     if news:
         for article in news:
             sentiment = simple_sentiment(article['title'])
@@ -142,45 +255,90 @@ try:
     else:
         st.info("No recent news found for this coin.")
 
+@st.fragment(run_every=refresh_interval)
+def key_metrics(coin_id):
+    coin = get_coin_details(coin_id)
     st.subheader("📌 Key Metrics")
     metrics = {
-        "💰 Current Price": f"${coin['market_data']['current_price']['usd']:,.2f}",
-        "🏦 Market Cap": f"${coin['market_data']['market_cap']['usd']:,.0f}",
-        "🔁 24h Volume": f"${coin['market_data']['total_volume']['usd']:,.0f}",
-        "🔄 Circulating Supply": f"{coin['market_data']['circulating_supply']:,.0f}",
-        "💎 Max Supply": f"{coin['market_data'].get('max_supply', '∞')}",
-        "🚀 All-Time High": f"${coin['market_data']['ath']['usd']:,.2f}"
+        "💰 Current Price": f"${coin.current_price:,.2f}",
+        "🏦 Market Cap": f"${coin.market_cap:,.0f}",
+        "🔁 24h Volume": f"${coin.total_volume:,.0f}",
+        "🔄 Circulating Supply": f"{coin.circulating_supply:,.0f}",
+        "💎 Max Supply": f"{coin.max_supply if coin.max_supply is not None else '∞'}",
+        "🚀 All-Time High": f"${coin.ath:,.2f}"
     }
     cols = st.columns(3)
     for i, (label, value) in enumerate(metrics.items()):
         with cols[i % 3]:
             st.metric(label, value)
 
-    # Technical Analysis Recommendation
-    tech_icon = "🟡"
-    tech_text = "Hold"
-    tech_reason = "RSI and MACD suggest a neutral state."
-    if current_rsi > 70:
-        tech_icon = "🔴"
-        tech_text = "Sell"
-        tech_reason = f"RSI is {current_rsi:.2f} (Overbought), MACD is below signal → bearish trend."
-    elif current_rsi < 30:
-        tech_icon = "🟢"
-        tech_text = "Buy"
-        tech_reason = f"RSI is {current_rsi:.2f} (Oversold), may rebound soon."
-    elif macd_diff > 0.001:
-        tech_icon = "🟢"
-        tech_text = "Buy"
-        tech_reason = "MACD is above the signal → bullish trend."
-    elif macd_diff < -0.001:
-        tech_icon = "🔴"
-        tech_text = "Sell"
-        tech_reason = "MACD is below the signal → bearish trend."
+@st.fragment(run_every=AI_REFRESH)
+def ai_recommendation(coin_id, coin_name):
+    # AI Suggestion with explanation
+    st.subheader("🤖 AI Summary & Suggestion")
+    ai_icon = "🟡"
+    ai_text = "Hold"
+    ai_reason = "AI didn't detect a strong trend."
+    history = get_crypto_history(coin_id, DEFAULT_DAYS)
+    trend_10day = (history.prices[-1] - history.prices[-10]) / history.prices[-10] * 100
+    st.markdown(f"📊 10-Day Price Change: **{trend_10day:.2f}%**")
 
-    st.markdown("<div class='card'>", unsafe_allow_html=True)
-    st.markdown(f"<h4>⚙️ Based on Technical Analysis: {tech_icon} <b>{tech_text}</b></h4>", unsafe_allow_html=True)
-    st.caption(f"💬 {tech_reason}")
-    st.markdown("</div>", unsafe_allow_html=True)
+    try:
+        # At most one model call per coin per AI_REFRESH, shared by every session,
+        # and only while someone has the page open
+        summary = get_hub().get(
+            ("ai_summary", coin_id),
+            lambda: fetch_ai_summary(coin_id, coin_name),
+            ttl=AI_REFRESH,
+            refresh=False
+        )
+        # Extract just the last part (after the prompt text)
+        cleaned = summary.split("Explain your reasoning in 1-2 lines.")[-1].strip()
+
+        st.markdown("### 🤖 AI Summary")
+        st.success(f"**{cleaned}**")
+        lower_summary = summary.lower()
+        if any(w in lower_summary for w in ["fall", "drop", "correction", "down"]):
+            ai_icon = "🔴"
+            ai_text = "Sell"
+            ai_reason = "AI detected a possible decline over recent days."
+        elif any(w in lower_summary for w in ["rise", "bullish", "increase", "uptrend"]):
+            ai_icon = "🟢"
+            ai_text = "Buy"
+            ai_reason = "AI summary suggests a bullish trend."
+        elif any(w in lower_summary for w in ["flat", "sideways", "stable"]):
+            ai_icon = "🟡"
+            ai_text = "Hold"
+            ai_reason = "AI indicates a stable or sideways trend."
+
+        st.markdown(f"### 🤖 Based on AI Summary: {ai_icon} **{ai_text}**")
+        st.caption(f"💬 {ai_reason}")
+
+    except Exception as e:
+        st.warning("⚠️ AI failed to respond.")
+        st.info("Fallback: Suggest holding position based on RSI and MACD.")
+
+    # Final Recommendation
+    tech_icon, tech_text = st.session_state.get("tech_signal", {}).get(coin_id, ("🟡", "Hold"))
+    st.subheader("🧠 Final Recommendation")
+    st.markdown(f"- 📊 Technical Analysis recommends: {tech_icon} **{tech_text}**")
+    st.markdown(f"- 🤖 AI Analysis suggests: {ai_icon} **{ai_text}**")
+
+    if tech_text == ai_text:
+        st.success(f"✅ Both sources agree: **You should {tech_text} it.**")
+    else:
+        st.info("⚖️ Mixed signals detected. Consider waiting or using additional indicators.")
+
+try:
+    coin = get_coin_details(coin_id)
+    age = stale_data_age()
+    if age is not None:
+        st.caption(f"⏳ Showing data from {age / 60:.0f} min ago while it refreshes.")
+    st.title(f"📈 {coin.name} ({coin.symbol.upper()})")
+
+    market_analysis(coin_id)
+    latest_news(coin.name)
+    key_metrics(coin_id)
 
     # --- Beginner-Friendly Technical Analysis ---
     st.markdown("<div class='card'>", unsafe_allow_html=True)
@@ -215,65 +373,7 @@ try:
             st.caption(f"💡 _{analogy}_")
     st.markdown("</div>", unsafe_allow_html=True)
 
-    # AI Suggestion with explanation
-    st.subheader("🤖 AI Summary & Suggestion")
-    ai_icon = "🟡"
-    ai_text = "Hold"
-    ai_reason = "AI didn't detect a strong trend."
-    trend_10day = (df['price'].iloc[-1] - df['price'].iloc[-10]) / df['price'].iloc[-10] * 100
-    st.markdown(f"📊 10-Day Price Change: **{trend_10day:.2f}%**")
-
-    try:
-        ai_prompt = f"""
-Crypto: {coin['name']}
-Last 10 days of price data:\n{df.tail(10).to_string(index=False)}
-Task: Summarize the recent price trend and recommend a short-term action.
-Explain your reasoning in 1-2 lines.
-"""
-
-        hf_url = "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.1"
-        headers = {"Authorization": f"Bearer {HF_API_TOKEN}"}
-        resp = requests.post(hf_url, headers=headers, json={"inputs": ai_prompt})
-
-        if resp.status_code == 200:
-            summary = resp.json()[0]["generated_text"]
-            # Extract just the last part (after the prompt text)
-            cleaned = summary.split("Explain your reasoning in 1-2 lines.")[-1].strip()
-
-            st.markdown("### 🤖 AI Summary")
-            st.success(f"**{cleaned}**")
-            lower_summary = summary.lower()
-            if any(w in lower_summary for w in ["fall", "drop", "correction", "down"]):
-                ai_icon = "🔴"
-                ai_text = "Sell"
-                ai_reason = "AI detected a possible decline over recent days."
-            elif any(w in lower_summary for w in ["rise", "bullish", "increase", "uptrend"]):
-                ai_icon = "🟢"
-                ai_text = "Buy"
-                ai_reason = "AI summary suggests a bullish trend."
-            elif any(w in lower_summary for w in ["flat", "sideways", "stable"]):
-                ai_icon = "🟡"
-                ai_text = "Hold"
-                ai_reason = "AI indicates a stable or sideways trend."
-
-            st.markdown(f"### 🤖 Based on AI Summary: {ai_icon} **{ai_text}**")
-            st.caption(f"💬 {ai_reason}")
-        else:
-            raise Exception("AI API failed")
-
-    except Exception as e:
-        st.warning("⚠️ AI failed to respond.")
-        st.info("Fallback: Suggest holding position based on RSI and MACD.")
-
-    # Final Recommendation
-    st.subheader("🧠 Final Recommendation")
-    st.markdown(f"- 📊 Technical Analysis recommends: {tech_icon} **{tech_text}**")
-    st.markdown(f"- 🤖 AI Analysis suggests: {ai_icon} **{ai_text}**")
-
-    if tech_text == ai_text:
-        st.success(f"✅ Both sources agree: **You should {tech_text} it.**")
-    else:
-        st.info("⚖️ Mixed signals detected. Consider waiting or using additional indicators.")
+    ai_recommendation(coin_id, coin.name)
 
 except Exception as e:
-    st.error(f"❌ Failed to load coin data: {e}")
\ No newline at end of file
+    st.error(f"❌ Failed to load coin data: {e}")
@@ -1,9 +1,9 @@
 import streamlit as st
-from data_fetcher import get_coin_details, get_crypto_history, get_top_coins
+from data_fetcher import get_coin_details, get_crypto_history, get_indicators, get_top_coins, stale_data_age
 from data_processing import process_coin_details
+from indicator_settings import add_ribbon, indicator_settings
 import pandas as pd
 import plotly.graph_objects as go
-from utils import calculate_rsi, calculate_macd
 
 # --- Sidebar Navigation ---
 st.sidebar.title("Crypto Dashboard")
@@ -13,6 +13,7 @@ page_map = {
     "Portfolio": "pages/Portfolio.py",
     "Coin Details": "pages/CoinDetails.py",
     "Compare": "pages/Compare.py",
+    "Export": "pages/Export.py",
     "Settings": "pages/Settings.py",
     "About": "pages/About.py"
 }
@@ -52,6 +53,9 @@ st.markdown("""
 # --- Coin Selectors ---
 top_coins = get_top_coins(100)
 coin_options = {f"{coin['name']} ({coin['symbol'].upper()})": coin['id'] for coin in top_coins}
+age = stale_data_age()
+if age is not None:
+    st.caption(f"⏳ Showing data from {age / 60:.0f} min ago while it refreshes.")
 
 col_select = st.columns(2)
 with col_select[0]:
@@ -61,14 +65,15 @@ with col_select[1]:
 
 coin1 = coin_options[coin1_name]
 coin2 = coin_options[coin2_name]
+names, params, ribbon = indicator_settings()
 
 if st.button("🔄 Compare"):
     try:
-        raw1 = get_coin_details(coin1)
-        raw2 = get_coin_details(coin2)
+        detail1 = get_coin_details(coin1)
+        detail2 = get_coin_details(coin2)
 
-        data1 = process_coin_details(raw1)
-        data2 = process_coin_details(raw2)
+        data1 = process_coin_details(detail1)
+        data2 = process_coin_details(detail2)
 
         df_compare = pd.DataFrame([data1, data2]).T
         df_compare.columns = [data1["Symbol"], data2["Symbol"]]
@@ -84,10 +89,10 @@ if st.button("🔄 Compare"):
         st.markdown("<div class='card'>", unsafe_allow_html=True)
         st.markdown("<h4>📉 Price Movement</h4>", unsafe_allow_html=True)
 
-        df1 = pd.DataFrame(get_crypto_history(coin1, 60)["prices"], columns=["timestamp", "price"])
-        df1["Date"] = pd.to_datetime(df1["timestamp"], unit="ms")
-        df2 = pd.DataFrame(get_crypto_history(coin2, 60)["prices"], columns=["timestamp", "price"])
-        df2["Date"] = pd.to_datetime(df2["timestamp"], unit="ms")
+        history1 = get_crypto_history(coin1, 60)
+        history2 = get_crypto_history(coin2, 60)
+        df1 = history1.to_frame()
+        df2 = history2.to_frame()
 
         fig = go.Figure()
         fig.add_trace(go.Scatter(x=df1["Date"], y=df1["price"], mode="lines", name=f"{data1['Symbol']} Price"))
@@ -100,10 +105,12 @@ if st.button("🔄 Compare"):
         st.markdown("<div class='card'>", unsafe_allow_html=True)
         st.markdown("<h4>⚙️ Basic Technicals (Last 60 Days)</h4>", unsafe_allow_html=True)
 
-        rsi1 = calculate_rsi(df1["price"]).dropna().iloc[-1]
-        rsi2 = calculate_rsi(df2["price"]).dropna().iloc[-1]
-        macd1_series, sig1_series = calculate_macd(df1["price"])
-        macd2_series, sig2_series = calculate_macd(df2["price"])
+        indicators1 = get_indicators(coin1, 60, names, params)
+        indicators2 = get_indicators(coin2, 60, names, params)
+        rsi1 = indicators1["rsi"].dropna().iloc[-1]
+        rsi2 = indicators2["rsi"].dropna().iloc[-1]
+        macd1_series, sig1_series = indicators1["macd"], indicators1["signal"]
+        macd2_series, sig2_series = indicators2["macd"], indicators2["signal"]
         macd1 = macd1_series.dropna().iloc[-1]
         sig1 = sig1_series.dropna().iloc[-1]
         macd2 = macd2_series.dropna().iloc[-1]
@@ -139,6 +146,19 @@ if st.button("🔄 Compare"):
         st.plotly_chart(comp_fig, use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
+        # --- Moving Average Ribbons ---
+        if ribbon:
+            st.markdown("<div class='card'>", unsafe_allow_html=True)
+            st.markdown("<h4>🌈 Moving Average Ribbons</h4>", unsafe_allow_html=True)
+            ribbon_cols = st.columns(2)
+            for col, data, df, indicators in ((ribbon_cols[0], data1, df1, indicators1), (ribbon_cols[1], data2, df2, indicators2)):
+                ribbon_fig = go.Figure()
+                ribbon_fig.add_trace(go.Scatter(x=df["Date"], y=df["price"], mode="lines", name="Price", line=dict(color="gray")))
+                add_ribbon(ribbon_fig, df["Date"], indicators, ribbon)
+                ribbon_fig.update_layout(title=data["Symbol"], xaxis_title="Date", yaxis_title="Price (USD)", height=450, showlegend=False)
+                col.plotly_chart(ribbon_fig, use_container_width=True)
+            st.markdown("</div>", unsafe_allow_html=True)
+
         # --- Beginner-Friendly Explanation ---
         st.markdown("<div class='card'>", unsafe_allow_html=True)
         st.markdown("<h4>📘 Beginner-Friendly Technical Analysis</h4>", unsafe_allow_html=True)
@@ -0,0 +1,68 @@
+import datetime
+import tempfile
+
+import streamlit as st
+from data_fetcher import get_top_coins, stale_data_age
+from export import FORMATS, export_history
+from utils import INDICATORS
+
+# --- Sidebar Navigation ---
+st.sidebar.title("Crypto Dashboard")
+st.sidebar.markdown("---")
+page_map = {
+    "Home": "Home.py",
+    "Portfolio": "pages/Portfolio.py",
+    "Coin Details": "pages/CoinDetails.py",
+    "Compare": "pages/Compare.py",
+    "Export": "pages/Export.py",
+    "Settings": "pages/Settings.py",
+    "About": "pages/About.py"
+}
+nav = st.sidebar.radio(
+    "Navigate",
+    list(page_map.keys()),
+    index=4
+)
+if nav != "Export":
+    st.switch_page(page_map[nav])
+st.title("📦 Export Data")
+
+st.markdown("Download price histories and indicators for any set of coins as Parquet or Arrow.")
+
+top_coins = get_top_coins(100)
+coin_options = {f"{coin['name']} ({coin['symbol'].upper()})": coin['id'] for coin in top_coins}
+age = stale_data_age()
+if age is not None:
+    st.caption(f"⏳ Showing data from {age / 60:.0f} min ago while it refreshes.")
+
+all_top = st.checkbox("All Top 100 Coins")
+selected = st.multiselect("Coins", list(coin_options), default=list(coin_options)[:5], disabled=all_top)
+coin_ids = [c["id"] for c in top_coins] if all_top else [coin_options[name] for name in selected]
+
+today = datetime.date.today()
+date_range = st.date_input("Date Range", (today - datetime.timedelta(days=365), today), max_value=today)
+indicators = st.multiselect("Indicators", list(INDICATORS), default=["rsi", "macd"])
+fmt = st.radio("Format", list(FORMATS), horizontal=True)
+st.caption("For larger exports (e.g. the top 500 coins) use the command line: `python -m export --help`.")
+
+def build_export():
+    # Written chunk by chunk to a temporary file; only the finished file is handed to Streamlit
+    start, end = date_range
+    out = tempfile.TemporaryFile()
+    export_history(
+        out, coin_ids, days=(today - start).days + 1, indicators=indicators, fmt=fmt,
+        start=start, end=end + datetime.timedelta(days=1)
+    )
+    out.seek(0)
+    return out
+
+if len(date_range) != 2 or not coin_ids:
+    st.info("Pick at least one coin and a start and end date.")
+else:
+    st.download_button(
+        f"⬇️ Download {len(coin_ids)} coin(s)",
+        data=build_export,
+        file_name=f"crypto_export_{date_range[0]}_{date_range[1]}{FORMATS[fmt]}",
+        mime="application/vnd.apache.parquet" if fmt == "parquet" else "application/vnd.apache.arrow.file",
+        on_click="ignore",
+    )
@@ -1,4 +1,7 @@
 import streamlit as st
+import pandas as pd
+from data_hub import get_hub
+from providers import get_router
 
 # --- Sidebar Navigation ---
 st.sidebar.title("Crypto Dashboard")
@@ -8,13 +11,14 @@ page_map = {
     "Portfolio": "pages/Portfolio.py",
     "Coin Details": "pages/CoinDetails.py",
     "Compare": "pages/Compare.py",
+    "Export": "pages/Export.py",
     "Settings": "pages/Settings.py",
     "About": "pages/About.py"
 }
 nav = st.sidebar.radio(
     "Navigate",
     list(page_map.keys()),
-    index=4
+    index=5
 )
 if nav != "Settings":
     st.switch_page(page_map[nav])
@@ -30,9 +34,34 @@ st.session_state.currency = currency.lower()
 refresh = st.slider("Auto Refresh Interval (seconds)", 30, 600, 180, step=30)
 st.session_state.refresh = refresh
 
+# Live prices: stream ticks over a websocket instead of waiting for the refresh interval
+live_stream = st.toggle("Live Price Stream (USD)", value=st.session_state.get("live_stream", False))
+st.session_state.live_stream = live_stream
+
 # Theme (you can store this too, even if not applied yet)
 theme = st.selectbox("Choose Theme", ["Light", "Dark", "Auto"])
 st.session_state.theme = theme
 
 
-st.success("✅ Settings saved! (Note: These are not persistent across sessions yet)")
\ No newline at end of file
+st.success("✅ Settings saved! (Note: These are not persistent across sessions yet)")
+
+# Shared cache: what it holds, how well it is doing, and a way to clear it
+with st.expander("🗄️ Data Cache"):
+    hub = get_hub()
+    st.caption(f"{hub.nbytes / 2**20:.1f} MB of {hub.max_bytes / 2**20:.0f} MB used, shared by all sessions")
+    stats = hub.stats()
+    if stats:
+        st.dataframe(pd.DataFrame.from_dict(stats, orient="index")[["entries", "bytes", "hits", "stale", "misses", "evictions"]])
+    if st.button("Clear Cached Data"):
+        hub.invalidate()
+        st.success("Cache cleared; data will be fetched again on the next page load.")
+
+with st.expander("🔌 Data Providers"):
+    st.caption("Requests go to the fastest healthy source first; slow ones are raced against the next source.")
+    rows = [
+        dict(provider=name, operation=op, **counts)
+        for name, ops in get_router().stats().items()
+        for op, counts in ops.items()
+    ]
+    if rows:
+        st.dataframe(pd.DataFrame(rows).set_index(["provider", "operation"]))
@@ -0,0 +1,142 @@
+"""
+Background prefetching of the coins users are likely to open next.
+
+Pages tell the prefetcher which coins they show (the top of the Home list,
+the watchlist, portfolio holdings); a small worker pool then loads their
+details and the 60-day history (plus its indicator frame) into the hub, so
+opening Coin Details reads a warm snapshot instead of waiting on CoinGecko.
+
+Prefetching only spends the part of CoinGecko's rate limit that page loads
+leave unused (see upstream.spare_capacity) and pauses while its breaker is
+open, sending one coin at a time as the trial call once it is half-open. On
+the first Home or Portfolio visit after the server starts, the top coins and
+the saved watchlist and holdings are warmed as well.
+
+CRYPTO_PREFETCH_WORKERS sets the pool size (0 turns prefetching off) and
+CRYPTO_WARM_TOP_N how many top coins are warmed.
+"""
+import collections
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from data_fetcher import get_coin_details, get_indicators, get_top_coins
+from data_hub import get_hub
+from upstream import get_breaker, spare_capacity
+
+WORKERS = int(os.environ.get("CRYPTO_PREFETCH_WORKERS", 2))
+WARM_TOP_N = int(os.environ.get("CRYPTO_WARM_TOP_N", 10))
+# First rows of Home cards
+VISIBLE_COINS = 12
+# The history Coin Details, Compare and Portfolio open with
+PREFETCH_DAYS = 60
+MAX_PENDING = 100
+# Share of the rate limit kept free for page loads
+RATE_RESERVE = 0.5
+# Upstream calls needed to warm one coin (details + history)
+CALLS_PER_COIN = 2
+
+
+class Prefetcher:
+    def __init__(self, workers=WORKERS, max_pending=MAX_PENDING, reserve=RATE_RESERVE):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.reserve = reserve
+        self.warmed = 0
+        # Most recently requested last; popped from the end
+        self._pending = collections.OrderedDict()
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(max(workers, 1))
+        self._pool = None
+        self._thread = None
+
+    def request(self, coin_ids):
+        """
+        Queue `coin_ids` for warming, earlier ids first and ahead of anything
+        requested before; past max_pending the oldest requests are dropped.
+        """
+        if self.workers <= 0:
+            return
+        with self._cond:
+            for coin_id in reversed(list(coin_ids)):
+                self._pending[coin_id] = None
+                self._pending.move_to_end(coin_id)
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+            self._cond.notify()
+        self.start()
+
+    def is_warm(self, coin_id):
+        """True when the hub holds fresh details and history for `coin_id`."""
+        hub = get_hub()
+        ages = (
+            hub.age(("coin_details", coin_id)),
+            hub.age(("crypto_history", coin_id, PREFETCH_DAYS, False)),
+        )
+        # The hub's refresher takes over from 80% of the TTL
+        return all(age is not None and age < hub.ttl * 0.8 for age in ages)
+
+    def warm_start(self, top_n=WARM_TOP_N):
+        """Warm the saved watchlist and holdings and the `top_n` coins by market cap."""
+        def run():
+            from portfolio_storage import load_portfolio_data
+            try:
+                saved = load_portfolio_data()
+                coin_ids = saved.get("watchlist", []) + [p["id"] for p in saved.get("portfolio", [])]
+                coin_ids += [coin["id"] for coin in get_top_coins(100)[:top_n]]
+            except Exception:
+                return
+            self.request(coin_ids)
+
+        threading.Thread(target=run, name="prefetch-warm-start", daemon=True).start()
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prefetch")
+            self._thread = threading.Thread(target=self._run, name="prefetch-dispatch", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                coin_id, _ = self._pending.popitem()
+            if self.is_warm(coin_id):
+                continue
+            # While the breaker is half-open, the coin's first request is the trial call
+            while spare_capacity("coingecko", self.reserve) < (
+                1 if get_breaker("coingecko").state == "half-open" else CALLS_PER_COIN
+            ):
+                time.sleep(1)
+            self._slots.acquire()
+            self._pool.submit(self._warm, coin_id)
+
+    def _warm(self, coin_id):
+        try:
+            get_coin_details(coin_id)
+            get_indicators(coin_id, PREFETCH_DAYS)
+            self.warmed += 1
+        except Exception:
+            # Prefetching is best effort; the page will fetch (and report) it
+            pass
+        finally:
+            self._slots.release()
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher():
+    """Return the prefetcher of this server process, warming the top coins on first use."""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher()
+            if _prefetcher.workers > 0:
+                _prefetcher.warm_start()
+        return _prefetcher
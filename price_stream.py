@@ -0,0 +1,152 @@
+"""
+Live price ticks from a websocket feed.
+
+A background thread subscribes to a CoinCap-style price feed
+(`wss://ws.coincap.io/prices?assets=bitcoin,ethereum`, messages like
+`{"bitcoin": "67012.41"}`) for the coins the pages ask about and keeps the last
+ticks of each coin in a fixed-size ring buffer, so memory stays flat however
+long the server runs. Prices are in USD.
+
+Set PRICE_STREAM_URL to point at another feed, e.g. the local stand-in in
+loadtest/stub_feed.py.
+"""
+import asyncio
+import collections
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+STREAM_URL = os.environ.get("PRICE_STREAM_URL", "wss://ws.coincap.io/prices")
+BUFFER_SIZE = 3600
+MAX_COINS = 250
+# How often live fragments redraw while streaming, in seconds
+RENDER_INTERVAL = 1
+
+
+class RingBuffer:
+    """Fixed-capacity buffer of (timestamp ms, price) ticks."""
+
+    def __init__(self, capacity=BUFFER_SIZE):
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.prices = np.zeros(capacity, dtype=np.float64)
+        self.capacity = capacity
+        self.count = 0
+        self._next = 0
+
+    def append(self, timestamp, price):
+        self.timestamps[self._next] = timestamp
+        self.prices[self._next] = price
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def latest(self):
+        if not self.count:
+            return None
+        i = self._next - 1
+        return int(self.timestamps[i]), float(self.prices[i])
+
+    def values(self):
+        """Return (timestamps, prices) copies in arrival order."""
+        if self.count < self.capacity:
+            return self.timestamps[:self.count].copy(), self.prices[:self.count].copy()
+        order = np.r_[self._next:self.capacity, 0:self._next]
+        return self.timestamps[order], self.prices[order]
+
+
+class PriceStream:
+    def __init__(self, url=STREAM_URL, buffer_size=BUFFER_SIZE, max_coins=MAX_COINS):
+        self.url = url
+        self.buffer_size = buffer_size
+        self.max_coins = max_coins
+        self.connected = False
+        self._buffers = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._resubscribe = threading.Event()
+        self._thread = None
+
+    def track(self, coin_ids):
+        """Subscribe to `coin_ids`; the least recently tracked coins are dropped past max_coins."""
+        added = False
+        with self._lock:
+            for coin_id in coin_ids:
+                if coin_id in self._buffers:
+                    self._buffers.move_to_end(coin_id)
+                else:
+                    self._buffers[coin_id] = RingBuffer(self.buffer_size)
+                    added = True
+            while len(self._buffers) > self.max_coins:
+                self._buffers.popitem(last=False)
+        if added:
+            self._resubscribe.set()
+        self.start()
+
+    def latest(self, coin_id):
+        """Return (timestamp ms, price) of the last tick for `coin_id`, or None."""
+        with self._lock:
+            buffer = self._buffers.get(coin_id)
+            return buffer.latest() if buffer is not None else None
+
+    def ticks(self, coin_id):
+        """Return (timestamps, prices) arrays of the buffered ticks for `coin_id`."""
+        with self._lock:
+            buffer = self._buffers.get(coin_id)
+            if buffer is None:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+            return buffer.values()
+
+    def on_message(self, message):
+        now = int(time.time() * 1000)
+        updates = json.loads(message)
+        with self._lock:
+            for coin_id, price in updates.items():
+                buffer = self._buffers.get(coin_id)
+                if buffer is not None:
+                    buffer.append(now, float(price))
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=lambda: asyncio.run(self._run()), name="price-stream", daemon=True)
+        self._thread.start()
+
+    async def _run(self):
+        from websockets.asyncio.client import connect
+
+        backoff = 1
+        while True:
+            with self._lock:
+                assets = sorted(self._buffers)
+            self._resubscribe.clear()
+            try:
+                async with connect(f"{self.url}?assets={','.join(assets)}") as ws:
+                    self.connected = True
+                    backoff = 1
+                    # Reconnect with the new asset list whenever track() adds coins
+                    while not self._resubscribe.is_set():
+                        try:
+                            message = await asyncio.wait_for(ws.recv(), timeout=0.5)
+                        except asyncio.TimeoutError:
+                            continue
+                        self.on_message(message)
+            except Exception:
+                self.connected = False
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            self.connected = False
+
+
+_stream = None
+_stream_lock = threading.Lock()
+
+
+def get_stream():
+    """Return the price stream shared by every session of this server process."""
+    global _stream
+    with _stream_lock:
+        if _stream is None:
+            _stream = PriceStream()
+        return _stream
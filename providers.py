@@ -0,0 +1,435 @@
+"""
+Market data providers and the router that picks between them.
+
+data_fetcher asks the router for top coins, coin details and histories. Each
+provider implements the operations it can serve:
+
+- CoinGeckoProvider: all three, the reference source
+- BinanceProvider: histories, from the exchange's USDT klines
+- LocalFileProvider: histories from Parquet/CSV files, e.g. an export
+
+For every call the router ranks the providers that can serve it by their
+recent latency and error rate and asks the best one. If that one hasn't
+answered within its p95 latency, a hedged request goes to the next provider
+and whichever answers first wins. Requests are never duplicated to the same
+provider: CoinGecko, the only source of some operations, is rate limited.
+A provider that fails falls through to the next.
+
+Only providers that answer at the same resolution as the first configured one
+(e.g. hourly points for 60 days) compete on latency and are hedged to; the
+others are fallbacks, tried in configured order once those have failed.
+
+CRYPTO_PROVIDERS lists the providers in order of preference (default
+"coingecko,binance"); "local" is added when CRYPTO_LOCAL_DATA points at a
+Parquet/CSV file or a directory of per-coin files.
+"""
+import collections
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from data_processing import CoinDetail, PriceSeries, downsample
+from upstream import api_url, get_json, is_upstream_failure
+
+DAY_MS = 86_400_000
+HOUR_MS = 3_600_000
+# Points kept of the 168 hourly prices in each coin's 7-day sparkline
+SPARKLINE_POINTS = 42
+
+LATENCY_WINDOW = 200
+ERROR_WINDOW = 50
+# Latency samples needed before a provider's own p95 is used as hedge delay
+MIN_SAMPLES = 20
+DEFAULT_HEDGE_DELAY = 1.0
+HEDGE_WORKERS = 16
+
+
+class UnsupportedError(LookupError):
+    """The provider can't serve this operation or this coin."""
+
+
+# CoinGecko id -> ticker symbol, learnt from CoinGecko responses; exchanges
+# only know coins by symbol
+_symbols = {}
+# Ticker symbol -> the CoinGecko ids seen using it
+_symbol_ids = collections.defaultdict(set)
+# CoinGecko id -> circulating supply, to estimate market caps from exchange prices
+_supplies = {}
+
+
+def remember_symbols(coins):
+    for coin in coins:
+        symbol = coin["symbol"].upper()
+        _symbols[coin["id"]] = symbol
+        _symbol_ids[symbol].add(coin["id"])
+        if coin.get("circulating_supply"):
+            _supplies[coin["id"]] = coin["circulating_supply"]
+
+
+def exchange_symbol(coin_id):
+    """The ticker of `coin_id`, or None if it isn't known or other coins share it (e.g. tokens reusing ETH)."""
+    symbol = _symbols.get(coin_id)
+    return symbol if symbol is not None and len(_symbol_ids[symbol]) == 1 else None
+
+
+def history_spacing(days):
+    """Milliseconds between the points of a CoinGecko /market_chart history of `days`."""
+    if days <= 1:
+        return 300_000
+    return HOUR_MS if days <= 90 else DAY_MS
+
+
+class Provider:
+    name = None
+
+    def supports(self, operation, *args):
+        return getattr(type(self), operation) is not getattr(Provider, operation)
+
+    def top_coins(self, limit, currency, page):
+        raise UnsupportedError(f"{self.name} has no market listing")
+
+    def coin_details(self, coin_id):
+        raise UnsupportedError(f"{self.name} has no coin details")
+
+    def history(self, coin_id, days, float32):
+        raise UnsupportedError(f"{self.name} has no price history")
+
+    def resolution(self, operation, *args):
+        """Spacing of the points this provider answers `operation(*args)` with; None when it varies."""
+        return None
+
+
+class CoinGeckoProvider(Provider):
+    name = "coingecko"
+
+    def top_coins(self, limit, currency, page):
+        url = api_url("coingecko", "/coins/markets")
+        params = {
+            "vs_currency": currency,
+            "order": "market_cap_desc",
+            "per_page": limit,
+            "page": page,
+            "sparkline": True,
+            "price_change_percentage": "24h"
+        }
+        coins = get_json("coingecko", url, params=params)
+        if not isinstance(coins, list):
+            raise ValueError(f"Unexpected markets response: {coins}")
+
+        # Rename currency fields
+        for coin in coins:
+            coin[f"current_price_{currency}"] = coin["current_price"]
+            coin[f"market_cap_{currency}"] = coin["market_cap"]
+            coin[f"total_volume_{currency}"] = coin["total_volume"]
+            # Stored as a small float32 array instead of 168 floats in a dict
+            sparkline = coin.pop("sparkline_in_7d", None) or {}
+            coin["sparkline"] = downsample(sparkline.get("price") or [], SPARKLINE_POINTS)
+        remember_symbols(coins)
+        return coins
+
+    def coin_details(self, coin_id):
+        url = api_url("coingecko", f"/coins/{coin_id}")
+        params = {
+            "localization": False,
+            "tickers": False,
+            "community_data": False,
+            "developer_data": False
+        }
+        # Keep only the fields the pages read; the full payload is dropped here
+        coin = CoinDetail.from_api(get_json("coingecko", url, params=params))
+        remember_symbols([{"id": coin.id, "symbol": coin.symbol, "circulating_supply": coin.circulating_supply}])
+        return coin
+
+    def history(self, coin_id, days, float32):
+        url = api_url("coingecko", f"/coins/{coin_id}/market_chart")
+        params = {
+            "vs_currency": "usd",
+            "days": days
+        }
+        return PriceSeries.from_market_chart(get_json("coingecko", url, params=params), float32=float32)
+
+    def resolution(self, operation, *args):
+        return history_spacing(args[1]) if operation == "history" else None
+
+
+class BinanceProvider(Provider):
+    """
+    USD prices from <SYMBOL>USDT klines, at CoinGecko's spacing for the same
+    days. Market caps are estimated from the circulating supply of the last
+    listing the coin was seen in, NaN if there was none.
+    """
+    name = "binance"
+    INTERVALS = {300_000: "5m", HOUR_MS: "1h", DAY_MS: "1d"}
+    MAX_KLINES = 1000
+
+    def supports(self, operation, *args):
+        # Only coins with a known ticker; the router then skips it for the rest
+        return super().supports(operation) and (not args or exchange_symbol(args[0]) is not None)
+
+    def history(self, coin_id, days, float32):
+        symbol = exchange_symbol(coin_id)
+        if symbol is None:
+            raise UnsupportedError(f"No unambiguous exchange symbol known for {coin_id}")
+        step = history_spacing(days)
+        now = int(time.time() * 1000)
+        start = now - days * DAY_MS
+        rows = []
+        # Up to MAX_KLINES per request, e.g. three pages for 90 days of hours
+        while start < now:
+            page = get_json("binance", api_url("binance", "/klines"), params={
+                "symbol": f"{symbol}USDT", "interval": self.INTERVALS[step], "startTime": start,
+                "limit": self.MAX_KLINES,
+            })
+            rows.extend(page)
+            if len(page) < self.MAX_KLINES:
+                break
+            start = page[-1][0] + step
+        # [open time, open, high, low, close, volume, close time, quote volume, ...]
+        klines = np.array([(row[6], row[4], row[7]) for row in rows], dtype=np.float64).reshape(-1, 3)
+        dtype = np.float32 if float32 else np.float64
+        # Like CoinGecko's total_volumes: rolling 24h volume in USD
+        quote_volume = np.cumsum(klines[:, 2])
+        per_day = DAY_MS // step
+        quote_volume[per_day:] = quote_volume[per_day:] - quote_volume[:-per_day]
+        return PriceSeries(
+            # Closed klines at the end of their interval, the open one at the current price's time
+            np.minimum(klines[:, 0].astype(np.int64) + 1, now),
+            klines[:, 1].astype(dtype),
+            quote_volume.astype(dtype),
+            (klines[:, 1] * _supplies.get(coin_id, np.nan)).astype(dtype),
+        )
+
+    def resolution(self, operation, *args):
+        return history_spacing(args[1]) if operation == "history" else None
+
+
+class LocalFileProvider(Provider):
+    """
+    Histories from a Parquet/CSV file with a coin_id column (such as an
+    export) or a directory of <coin_id>.parquet / <coin_id>.csv files.
+    Columns: timestamp (ms or datetime), price, and optionally volume and
+    market_cap. `days` counts back from the last row.
+    """
+    name = "local"
+
+    def __init__(self, path):
+        self.path = path
+
+    def _read(self, coin_id):
+        if os.path.isdir(self.path):
+            for extension in (".parquet", ".csv"):
+                path = os.path.join(self.path, coin_id + extension)
+                if os.path.exists(path):
+                    return pd.read_parquet(path) if extension == ".parquet" else pd.read_csv(path)
+            raise UnsupportedError(f"No local data for {coin_id}")
+        if self.path.endswith(".csv"):
+            frame = pd.read_csv(self.path)
+            return frame[frame["coin_id"] == coin_id]
+        return pd.read_parquet(self.path, filters=[("coin_id", "==", coin_id)])
+
+    def history(self, coin_id, days, float32):
+        frame = self._read(coin_id)
+        if frame.empty:
+            raise UnsupportedError(f"No local data for {coin_id}")
+        timestamps = frame["timestamp"]
+        if pd.api.types.is_numeric_dtype(timestamps):
+            timestamps = timestamps.to_numpy(np.int64)
+        else:
+            since_epoch = pd.to_datetime(timestamps, utc=True) - pd.Timestamp(0, tz="UTC")
+            timestamps = (since_epoch // pd.Timedelta(milliseconds=1)).to_numpy(np.int64)
+        order = np.argsort(timestamps, kind="stable")
+        keep = order[timestamps[order] >= timestamps[order[-1]] - days * DAY_MS]
+        dtype = np.float32 if float32 else np.float64
+
+        def column(name):
+            if name not in frame:
+                return np.full(len(keep), np.nan, dtype=dtype)
+            return frame[name].to_numpy(np.float64)[keep].astype(dtype)
+
+        return PriceSeries(timestamps[keep], column("price"), column("volume"), column("market_cap"))
+
+
+class _Stats:
+    __slots__ = ("latencies", "outcomes", "calls", "errors", "hedges", "hedge_wins")
+
+    def __init__(self):
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.outcomes = collections.deque(maxlen=ERROR_WINDOW)
+        self.calls = 0
+        self.errors = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def percentile(self, q):
+        return float(np.percentile(self.latencies, q)) if len(self.latencies) >= MIN_SAMPLES else None
+
+    @property
+    def error_rate(self):
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+
+class ProviderRouter:
+    def __init__(self, providers, hedge_delay=DEFAULT_HEDGE_DELAY, workers=HEDGE_WORKERS):
+        self.providers = list(providers)
+        self.hedge_delay = hedge_delay
+        self._stats = collections.defaultdict(_Stats)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="provider")
+
+    def rank(self, operation, *args):
+        """
+        Providers that can serve `operation(*args)`. Those at the resolution of
+        the first configured one come first, fastest first with errors
+        penalised and unmeasured ones in their configured order; providers at
+        other resolutions follow in configured order.
+        """
+        candidates = [p for p in self.providers if p.supports(operation, *args)]
+        if not candidates:
+            return []
+        reference = candidates[0].resolution(operation, *args)
+
+        def score(provider):
+            index = self.providers.index(provider)
+            if provider.resolution(operation, *args) != reference:
+                return (2, 0.0, index)
+            stats = self._stats[provider.name, operation]
+            if not stats.latencies:
+                return (1, 0.0, index)
+            return (0, float(np.median(stats.latencies)) * (1 + 4 * stats.error_rate), index)
+
+        with self._lock:
+            return sorted(candidates, key=score)
+
+    def _delay(self, provider, operation):
+        with self._lock:
+            p95 = self._stats[provider.name, operation].percentile(95)
+        return self.hedge_delay if p95 is None else p95
+
+    def _timed(self, provider, operation, args):
+        start = time.perf_counter()
+        try:
+            result = getattr(provider, operation)(*args)
+        except UnsupportedError:
+            raise
+        except Exception as e:
+            # A 404 for an unknown coin says nothing about the provider's health
+            if is_upstream_failure(e):
+                with self._lock:
+                    stats = self._stats[provider.name, operation]
+                    stats.calls += 1
+                    stats.errors += 1
+                    stats.outcomes.append(False)
+            raise
+        with self._lock:
+            stats = self._stats[provider.name, operation]
+            stats.calls += 1
+            stats.latencies.append(time.perf_counter() - start)
+            stats.outcomes.append(True)
+        return result
+
+    def call(self, operation, *args):
+        """
+        Return the first successful answer to `operation(*args)`, hedging once
+        to the next provider when the preferred one is slower than its p95 and
+        the next answers at the same resolution.
+        If every provider fails, the error of the most preferred one is raised.
+        """
+        candidates = self.rank(operation, *args)
+        if not candidates:
+            raise UnsupportedError(f"No provider serves {operation}")
+        waiting = list(candidates)
+        pending = {}
+        failures = []
+
+        def launch(provider):
+            future = self._pool.submit(self._timed, provider, operation, args)
+            pending[future] = provider
+            return future
+
+        primary = waiting.pop(0)
+        launch(primary)
+        hedge = None
+        while pending:
+            can_hedge = hedge is None and waiting and (
+                waiting[0].resolution(operation, *args) == primary.resolution(operation, *args)
+            )
+            timeout = self._delay(primary, operation) if can_hedge else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedge = launch(waiting.pop(0))
+                with self._lock:
+                    self._stats[primary.name, operation].hedges += 1
+                continue
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    result = future.result()
+                except UnsupportedError:
+                    continue
+                except Exception as e:
+                    failures.append((self.providers.index(provider), e))
+                    continue
+                if future is hedge:
+                    with self._lock:
+                        self._stats[primary.name, operation].hedge_wins += 1
+                return result
+            if not pending and waiting:
+                # Fail over to the next provider
+                primary = waiting.pop(0)
+                hedge = None
+                launch(primary)
+        if failures:
+            raise min(failures, key=lambda failure: failure[0])[1]
+        raise UnsupportedError(f"No provider could serve {operation}{args}")
+
+    def stats(self):
+        """{provider: {operation: counters}} with call and error counts, p50/p95 latency and hedges."""
+        report = {}
+        with self._lock:
+            for (name, operation), stats in self._stats.items():
+                p50, p95 = stats.percentile(50), stats.percentile(95)
+                report.setdefault(name, {})[operation] = {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "error_rate": round(stats.error_rate, 3),
+                    "p50_ms": None if p50 is None else round(p50 * 1000, 1),
+                    "p95_ms": None if p95 is None else round(p95 * 1000, 1),
+                    "hedges": stats.hedges,
+                    "hedge_wins": stats.hedge_wins,
+                }
+        return report
+
+
+def providers_from_env():
+    names = [n.strip() for n in os.environ.get("CRYPTO_PROVIDERS", "coingecko,binance").split(",") if n.strip()]
+    local_data = os.environ.get("CRYPTO_LOCAL_DATA")
+    if local_data and "local" not in names:
+        names.append("local")
+    factories = {
+        "coingecko": CoinGeckoProvider,
+        "binance": BinanceProvider,
+        "local": lambda: LocalFileProvider(local_data),
+    }
+    unknown = [n for n in names if n not in factories]
+    if unknown:
+        raise ValueError(f"Unknown providers in CRYPTO_PROVIDERS: {', '.join(unknown)}")
+    if "local" in names and not local_data:
+        raise ValueError("The local provider needs CRYPTO_LOCAL_DATA")
+    return [factories[name]() for name in names]
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """Return the provider router shared by every session of this server process."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ProviderRouter(providers_from_env())
+        return _router
@@ -0,0 +1,113 @@
+"""
+On-disk archive of upstream responses for record/replay runs.
+
+With CRYPTO_DATA_MODE=record every response fetched by upstream.get_json is
+saved to the archive directory (CRYPTO_DATA_ARCHIVE, default "recordings");
+with CRYPTO_DATA_MODE=replay responses are served from it without touching the
+network, so slow-page reports and benchmarks can be rerun on identical data.
+
+The archive is an index.json plus one append-only data.bin. market_chart
+responses are stored as raw float64 arrays that replay reads straight from a
+memory map; everything else is stored as zlib-compressed JSON.
+"""
+import json
+import mmap
+import os
+import threading
+import zlib
+
+import numpy as np
+
+SERIES_FIELDS = {"prices", "total_volumes", "market_caps"}
+_ALIGN = 8
+
+
+class ReplayMissError(LookupError):
+    pass
+
+
+def archive_key(service, path, params=None):
+    """Stable key for a request; API keys are left out so archives can be shared."""
+    query = sorted((k, str(v)) for k, v in (params or {}).items() if k.lower() != "apikey")
+    return f"{service} {path}?" + "&".join(f"{k}={v}" for k, v in query)
+
+
+def _is_series(data):
+    return isinstance(data, dict) and data and set(data) <= SERIES_FIELDS
+
+
+class ResponseArchive:
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        self.data_path = os.path.join(directory, "data.bin")
+        self._lock = threading.Lock()
+        self._map = None
+        try:
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+        except FileNotFoundError:
+            self.index = {}
+
+    def save(self, key, data):
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(self.data_path, "ab") as f:
+            offset = f.tell()
+            if offset % _ALIGN:
+                f.write(b"\0" * (_ALIGN - offset % _ALIGN))
+                offset = f.tell()
+            if _is_series(data):
+                columns = {}
+                for name, points in data.items():
+                    values = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+                    columns[name] = [f.tell(), len(values)]
+                    f.write(values.tobytes())
+                entry = {"kind": "series", "columns": columns}
+            else:
+                blob = zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+                f.write(blob)
+                entry = {"kind": "json", "offset": offset, "length": len(blob)}
+            self.index[key] = entry
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w") as index_file:
+                json.dump(self.index, index_file)
+            os.replace(tmp_path, self.index_path)
+
+    def _data(self):
+        if self._map is None:
+            with open(self.data_path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def load(self, key):
+        entry = self.index.get(key)
+        if entry is None:
+            raise ReplayMissError(f"No recorded response for {key}")
+        with self._lock:
+            data = self._data()
+        if entry["kind"] == "series":
+            # Views into the memory map: nothing is read until the values are used
+            return {
+                name: np.frombuffer(data, dtype=np.float64, count=rows * 2, offset=offset).reshape(rows, 2)
+                for name, (offset, rows) in entry["columns"].items()
+            }
+        blob = data[entry["offset"]:entry["offset"] + entry["length"]]
+        return json.loads(zlib.decompress(blob))
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def data_mode():
+    """'record', 'replay' or None (live)."""
+    mode = os.environ.get("CRYPTO_DATA_MODE", "").strip().lower()
+    return mode if mode in ("record", "replay") else None
+
+
+def get_archive():
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = ResponseArchive(os.environ.get("CRYPTO_DATA_ARCHIVE", "recordings"))
+        return _archive
@@ -0,0 +1,50 @@
+"""
+Market screener over the top-coins snapshot.
+
+Filters and sorts the coins returned by get_top_coins on their market cap,
+volume, price and 24h change, as columns rather than coin by coin.
+"""
+import numpy as np
+
+SORT_FIELDS = {
+    "rank": "market_cap_rank",
+    "market_cap": "market_cap_{currency}",
+    "volume": "total_volume_{currency}",
+    "price": "current_price_{currency}",
+    "change_24h": "price_change_percentage_24h",
+}
+
+
+def _column(coins, field):
+    return np.array([np.nan if c.get(field) is None else c[field] for c in coins], dtype=np.float64)
+
+
+def screen_coins(coins, currency="usd", min_market_cap=None, max_market_cap=None, min_volume=None,
+                 min_change=None, max_change=None, sort_by="market_cap", descending=True, limit=None):
+    """
+    Return the coins within every given bound, sorted by `sort_by` (one of
+    SORT_FIELDS). Coins missing a bounded field are left out.
+    """
+    if sort_by not in SORT_FIELDS:
+        raise ValueError(f"sort_by must be one of {', '.join(SORT_FIELDS)}")
+    bounds = [
+        (f"market_cap_{currency}", min_market_cap, max_market_cap),
+        (f"total_volume_{currency}", min_volume, None),
+        ("price_change_percentage_24h", min_change, max_change),
+    ]
+    keep = np.ones(len(coins), dtype=bool)
+    for field, low, high in bounds:
+        if low is None and high is None:
+            continue
+        values = _column(coins, field)
+        # NaN fails both comparisons, so coins without the field drop out
+        with np.errstate(invalid="ignore"):
+            if low is not None:
+                keep &= values >= low
+            if high is not None:
+                keep &= values <= high
+    selected = np.flatnonzero(keep)
+    keys = _column(coins, SORT_FIELDS[sort_by].format(currency=currency))[selected]
+    # Missing values sort last either way
+    order = np.argsort(np.where(np.isnan(keys), np.inf, -keys if descending else keys), kind="stable")
+    return [coins[i] for i in selected[order][:limit]]
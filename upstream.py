@@ -0,0 +1,187 @@
+"""
+HTTP access to the upstream APIs (CoinGecko, Binance, NewsAPI).
+
+Every call goes through a per-service circuit breaker: after a few consecutive
+failures the breaker opens and calls fail fast with CircuitOpenError instead of
+waiting on requests that are bound to fail. After `reset_timeout` seconds one
+trial call is let through; if it succeeds the breaker closes again.
+
+Calls are also counted per service over the last minute, so background work
+can limit itself to the part of the rate limit page loads aren't using.
+
+Responses can be recorded to and replayed from disk (see response_archive).
+"""
+import collections
+import os
+import threading
+import time
+
+import requests
+
+from response_archive import archive_key, data_mode, get_archive
+
+REQUEST_TIMEOUT = 10
+
+# Base URLs can be pointed at the local stand-in server (see loadtest/stub_server.py)
+API_BASES = {
+    "coingecko": os.environ.get("COINGECKO_API_URL", "https://api.coingecko.com/api/v3"),
+    "binance": os.environ.get("BINANCE_API_URL", "https://api.binance.com/api/v3"),
+    "newsapi": os.environ.get("NEWSAPI_URL", "https://newsapi.org/v2"),
+    "huggingface": os.environ.get("HF_INFERENCE_URL", "https://api-inference.huggingface.co/models"),
+}
+
+# Requests per minute each service allows (CoinGecko's public API: ~30)
+RATE_LIMITS = {
+    "coingecko": int(os.environ.get("COINGECKO_RATE_LIMIT", 30)),
+}
+RATE_WINDOW = 60
+
+
+def api_url(service, path):
+    return API_BASES[service] + path
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=3, reset_timeout=60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.time() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(service):
+    with _breakers_lock:
+        if service not in _breakers:
+            _breakers[service] = CircuitBreaker(service)
+        return _breakers[service]
+
+
+_calls = collections.defaultdict(collections.deque)
+_calls_lock = threading.Lock()
+
+
+def _window(service, now):
+    """Timestamps of the calls to `service` in the last RATE_WINDOW seconds; needs _calls_lock."""
+    calls = _calls[service]
+    while calls and calls[0] < now - RATE_WINDOW:
+        calls.popleft()
+    return calls
+
+
+def _record_call(service):
+    now = time.time()
+    with _calls_lock:
+        _window(service, now).append(now)
+
+
+def recent_calls(service):
+    """Number of requests sent to `service` in the last RATE_WINDOW seconds."""
+    with _calls_lock:
+        return len(_window(service, time.time()))
+
+
+def spare_capacity(service, reserve=0.5):
+    """
+    Requests `service` can still take in the current window while leaving
+    `reserve` of its rate limit free for page loads; 0 while its breaker is
+    open, at most 1 (the trial call) while it is half-open.
+    """
+    breaker = get_breaker(service)
+    state = breaker.state
+    if state == "open" or state == "half-open" and breaker._trial_running:
+        return 0
+    limit = RATE_LIMITS.get(service)
+    capacity = float("inf") if limit is None else max(0, int(limit * (1 - reserve)) - recent_calls(service))
+    return min(capacity, 1) if state == "half-open" else capacity
+
+
+def is_upstream_failure(error):
+    """Rate limits, server errors and network problems count against the breaker; other 4xx don't."""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return True
+
+
+def _without_url(service, error):
+    """The same kind of error with a message that leaves out the URL, whose query can hold API keys."""
+    response = error.response
+    if isinstance(error, requests.HTTPError) and response is not None:
+        return requests.HTTPError(f"{service} returned {response.status_code} {response.reason}", response=response)
+    return type(error)(f"{service} request failed ({type(error).__name__})")
+
+
+def get_json(service, url, params=None, headers=None):
+    """
+    GET `url` and return the decoded JSON body.
+    Raises CircuitOpenError without touching the network while the service's breaker is open.
+    """
+    mode = data_mode()
+    if mode is not None:
+        base = API_BASES[service]
+        key = archive_key(service, url[len(base):] if url.startswith(base) else url, params)
+        if mode == "replay":
+            return get_archive().load(key)
+
+    breaker = get_breaker(service)
+    if not breaker.allow():
+        raise CircuitOpenError(f"{service} is unavailable, retrying in a moment")
+    _record_call(service)
+    try:
+        response = requests.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+    except (requests.RequestException, ValueError) as e:
+        if is_upstream_failure(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if isinstance(e, requests.RequestException) and not isinstance(e, ValueError):
+            raise _without_url(service, e) from None
+        raise
+    breaker.record_success()
+    if mode == "record":
+        get_archive().save(key, data)
+    return data
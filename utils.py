@@ -1,8 +1,18 @@
+import inspect
+
 import pandas as pd
 import numpy as np
+from data_processing import PriceSeries
+
+def _as_series(prices):
+    # Indicators accept a PriceSeries from get_crypto_history or any pandas Series
+    if isinstance(prices, PriceSeries):
+        return prices.price_series()
+    return prices
 
 # --- Technical Indicators ---
 def calculate_rsi(prices, period=14):
+    prices = _as_series(prices)
     delta = prices.diff()
     gain = delta.where(delta > 0, 0)
     loss = -delta.where(delta < 0, 0)
@@ -12,6 +22,7 @@ def calculate_rsi(prices, period=14):
     return 100 - (100 / (1 + rs))
 
 def calculate_macd(prices, span_short=12, span_long=26, span_signal=9):
+    prices = _as_series(prices)
     ema_short = prices.ewm(span=span_short, adjust=False).mean()
     ema_long = prices.ewm(span=span_long, adjust=False).mean()
     macd = ema_short - ema_long
@@ -19,12 +30,15 @@ def calculate_macd(prices, span_short=12, span_long=26, span_signal=9):
     return macd, signal
 
 def calculate_sma(prices, window=20):
+    prices = _as_series(prices)
     return prices.rolling(window=window).mean()
 
 def calculate_ema(prices, span=20):
+    prices = _as_series(prices)
     return prices.ewm(span=span, adjust=False).mean()
 
 def calculate_bollinger_bands(prices, window=20, num_std=2):
+    prices = _as_series(prices)
     sma = calculate_sma(prices, window)
     std = prices.rolling(window=window).std()
     upper_band = sma + (std * num_std)
@@ -32,7 +46,149 @@ def calculate_bollinger_bands(prices, window=20, num_std=2):
     return sma, upper_band, lower_band
 
 def calculate_stochastic_oscillator(prices, window=14):
+    prices = _as_series(prices)
     low_min = prices.rolling(window=window).min()
     high_max = prices.rolling(window=window).max()
     k = 100 * (prices - low_min) / (high_max - low_min)
     return k
+
+# Default windows of the moving-average ribbons
+RIBBON_WINDOWS = (5, 10, 20, 30, 50, 100, 150, 200)
+# Largest exponent of the decay factor in one EWMA block (e**600 is still a finite float64)
+EWMA_EXPONENT_LIMIT = 600.0
+# Longest series the blocked EWMA kernel is used for. Below it the kernel takes
+# a third to a half of the time of one ewm() call per span; on long series its extra
+# passes over the (points x spans) block can make it the slower of the two
+EWMA_KERNEL_MAX_POINTS = 5000
+
+def _ribbon_windows(windows):
+    windows = sorted({int(w) for w in windows})
+    if not windows or windows[0] < 1:
+        raise ValueError("Ribbon windows must be positive integers")
+    return windows
+
+def _rolling_means(values, windows):
+    """
+    Simple moving averages of `values` for every window at once, shape
+    (len(values), len(windows)), from a single cumulative sum: each mean is
+    the difference of two prefix sums. A mean is NaN until its window is full
+    and while the window holds a NaN, as with rolling().mean().
+    """
+    values = np.asarray(values, dtype=np.float64)
+    windows = np.asarray(windows, dtype=np.int64)
+    missing = np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(missing, 0.0, values))))
+    gaps = np.concatenate(([0], np.cumsum(missing)))
+    end = np.arange(1, len(values) + 1)[:, None]
+    start = end - windows
+    full = start >= 0
+    start = np.maximum(start, 0)
+    means = (sums[end] - sums[start]) / windows
+    means[~full | (gaps[end] != gaps[start])] = np.nan
+    return means
+
+def _ewmas(values, spans):
+    """
+    Exponential moving averages (ewm(span=..., adjust=False)) of `values` for
+    every span at once, shape (len(values), len(spans)).
+
+    The recursion y[t] = d*y[t-1] + a*x[t] unrolls to
+    y[t] = d**t * (y[0] + a * sum(x[s] * d**-s)), i.e. one cumulative sum of
+    rescaled values. It is taken in blocks short enough that d**-s stays
+    finite, carrying the last average from block to block.
+
+    Series longer than EWMA_KERNEL_MAX_POINTS, or with gaps after the first
+    price (across which ewm() decays the weight of the last average), go
+    through ewm() one span at a time instead.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    spans = np.asarray(spans, dtype=np.float64)
+    out = np.full((len(values), len(spans)), np.nan)
+    present = np.flatnonzero(~np.isnan(values))
+    if not len(present):
+        return out
+    first = present[0]
+    if len(values) > EWMA_KERNEL_MAX_POINTS or len(present) < len(values) - first:
+        series = pd.Series(values)
+        return np.column_stack([series.ewm(span=span, adjust=False).mean().to_numpy() for span in spans])
+    values = values[first:]
+    alpha = 2.0 / (spans + 1.0)
+    decay = np.maximum(1.0 - alpha, 1e-12)
+    log_growth = -np.log(decay)
+    block = max(int(EWMA_EXPONENT_LIMIT / log_growth.max()), 1)
+    growth = np.exp(np.arange(block)[:, None] * log_growth)
+    level = np.full(len(spans), values[0])
+    for lo in range(0, len(values), block):
+        chunk = values[lo:lo + block]
+        scale = growth[:len(chunk)]
+        means = (decay * level + alpha * np.cumsum(chunk[:, None] * scale, axis=0)) / scale
+        out[first + lo:first + lo + len(chunk)] = means
+        level = means[-1]
+    return out
+
+def sma_ribbon(prices, windows=RIBBON_WINDOWS):
+    """SMAs for all `windows` in one pass, as columns sma_<window>."""
+    prices = _as_series(prices)
+    windows = _ribbon_windows(windows)
+    return pd.DataFrame(
+        _rolling_means(prices.to_numpy(), windows), index=prices.index, columns=[f"sma_{w}" for w in windows]
+    )
+
+def ema_ribbon(prices, windows=RIBBON_WINDOWS):
+    """EMAs for all spans in `windows` in one pass, as columns ema_<span>."""
+    prices = _as_series(prices)
+    windows = _ribbon_windows(windows)
+    return pd.DataFrame(
+        _ewmas(prices.to_numpy(), windows), index=prices.index, columns=[f"ema_{w}" for w in windows]
+    )
+
+# Indicator groups by name, each giving its output columns for a price series;
+# keyword arguments override the default periods
+INDICATORS = {
+    "rsi": lambda prices, period=14: {"rsi": calculate_rsi(prices, period)},
+    "macd": lambda prices, span_short=12, span_long=26, span_signal=9: dict(
+        zip(("macd", "signal"), calculate_macd(prices, span_short, span_long, span_signal))
+    ),
+    "sma": lambda prices, window=20: {"sma": calculate_sma(prices, window)},
+    "ema": lambda prices, span=20: {"ema": calculate_ema(prices, span)},
+    "bollinger": lambda prices, window=20, num_std=2: dict(
+        zip(("bb_mid", "bb_upper", "bb_lower"), calculate_bollinger_bands(prices, window, num_std))
+    ),
+    "stochastic": lambda prices, window=14: {"stoch_k": calculate_stochastic_oscillator(prices, window)},
+    "sma_ribbon": lambda prices, windows=RIBBON_WINDOWS: dict(sma_ribbon(prices, windows).items()),
+    "ema_ribbon": lambda prices, windows=RIBBON_WINDOWS: dict(ema_ribbon(prices, windows).items()),
+}
+# The indicators computed when none are named
+DEFAULT_INDICATORS = ("rsi", "macd", "sma", "ema", "bollinger", "stochastic")
+
+def indicator_args(names=None, params=None):
+    """
+    `names` and `params` for indicator_frame with the defaults left out:
+    names is None for DEFAULT_INDICATORS and params keeps only arguments that
+    differ from the registry's (None if none do), so equal choices compare equal.
+    """
+    names = None if names is None or tuple(names) == DEFAULT_INDICATORS else tuple(names)
+    changed = {}
+    for name in names or DEFAULT_INDICATORS:
+        defaults = inspect.signature(INDICATORS[name]).parameters
+        args = {
+            arg: tuple(value) if isinstance(value, list) else value
+            for arg, value in (params or {}).get(name, {}).items()
+        }
+        args = {arg: value for arg, value in args.items() if arg not in defaults or value != defaults[arg].default}
+        if args:
+            changed[name] = args
+    return names, changed or None
+
+def indicator_frame(prices, names=None, params=None):
+    """
+    The indicators in `names` (default: DEFAULT_INDICATORS), one column each.
+    `params` maps indicator names to keyword arguments replacing their
+    defaults, e.g. {"rsi": {"period": 21}, "ema_ribbon": {"windows": (5, 50, 200)}}.
+    """
+    prices = _as_series(prices)
+    params = params or {}
+    columns = {}
+    for name in names or DEFAULT_INDICATORS:
+        columns.update(INDICATORS[name](prices, **params.get(name, {})))
+    return pd.DataFrame(columns)